@@ -20,3 +20,8 @@ if path not in sys.path:
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Teacher_portal.settings')
 
 application = get_asgi_application()
+
+from portal.events import track_disconnects  # noqa: E402 (needs the apps loaded above)
+
+# Lets student event streams end when their client disconnects
+application = track_disconnects(application)
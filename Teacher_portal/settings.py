@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'portal.middleware.RequestTimingMiddleware',
+    'portal.middleware.MetricsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +86,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File-backed test database so concurrent-write tests get real locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -96,6 +100,66 @@ if DATABASE_URL:
         conn_health_checks=True,
     )
 
+# Caches: a bounded in-process LRU by default; set REDIS_URL to share one
+# cache between workers and instances
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'teacher-portal',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+# With a shared cache, sessions are read from it and only fall back to the
+# database on a miss; an in-process cache would let a logged-out session live
+# on in other workers, so sessions stay in the database without REDIS_URL. Set
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies to keep them
+# client-side instead
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+
+# Serve request.user from the shared cache (see portal.backends); without one,
+# a password change would not log the teacher out of other workers
+AUTHENTICATION_BACKENDS = [
+    'portal.backends.CachedModelBackend' if REDIS_URL else 'django.contrib.auth.backends.ModelBackend',
+]
+TEACHER_CACHE = 'default'
+TEACHER_CACHE_TIMEOUT = 300
+
+# Password hashing profile. Hashers after the first only verify existing
+# hashes, which are re-encoded with the first one on the next login
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': [
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'portal.hashers.TunedArgon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+    'argon2': [
+        'portal.hashers.TunedArgon2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+# Threads that may hash passwords at once (see portal.hashers)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -124,3 +188,86 @@ AUTH_USER_MODEL = 'portal.Teacher'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/home/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Student list pagination (keyset on id)
+STUDENT_LIST_PAGE_SIZE = 100
+STUDENT_LIST_MAX_PAGE_SIZE = 1000
+# Rows fetched per database round-trip when streaming the full list
+STUDENT_STREAM_CHUNK_SIZE = 2000
+
+# Maximum number of entries accepted by the batch add endpoint
+STUDENT_BATCH_MAX_ROWS = 10000
+
+# Serve the student list/add/update/delete and health endpoints with native
+# async views (for the uvicorn ASGI deployment); False uses the sync views
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'true').lower() != 'false'
+
+# Change feed (/students/changes/): rows changed up to this many seconds
+# before the client's token are sent again, covering writes that committed
+# late; beyond MAX_ROWS changes, or for tokens older than the tombstone
+# retention (seconds, see `manage.py prune_tombstones`), clients reload the list
+STUDENT_CHANGES_OVERLAP = 5
+STUDENT_CHANGES_MAX_ROWS = 1000
+STUDENT_TOMBSTONE_RETENTION = 7 * 24 * 3600
+
+# Live student events (/students/events/, served by the async views under
+# ASGI). The backend fans events out to the other workers: Redis pub/sub when
+# REDIS_URL is set, otherwise this process only. Each client gets a queue of
+# QUEUE_SIZE events and is told to resync if it falls that far behind; idle
+# streams get a keepalive comment every KEEPALIVE seconds, and browsers
+# reconnect after RETRY seconds
+STUDENT_EVENTS_BACKEND = os.environ.get(
+    'STUDENT_EVENTS_BACKEND',
+    'portal.events.RedisBackend' if REDIS_URL else 'portal.events.LocalBackend',
+)
+STUDENT_EVENTS_QUEUE_SIZE = 64
+STUDENT_EVENTS_KEEPALIVE = 15
+STUDENT_EVENTS_RETRY = 5
+# Streams are closed after this many seconds, bounding how long one survives
+# a disconnect the server could not detect (outside portal.events.track_disconnects)
+STUDENT_EVENTS_MAX_AGE = 300
+
+# Cache alias and lifetime (seconds) of student list pages. Keys embed the
+# table version, so writes invalidate pages as soon as they commit
+STUDENT_LIST_CACHE = 'default'
+STUDENT_LIST_CACHE_TIMEOUT = 300
+# Lifetime (seconds) of the cached subject names, kept in the same cache and
+# dropped whenever a subject is created
+SUBJECT_LIST_CACHE_TIMEOUT = 3600
+# Cache alias and lifetime (seconds) of table versions; bounds how long a
+# worker can serve a version that missed a concurrent bump. Versions are only
+# cached in a shared backend (REDIS_URL) and read from the database otherwise
+TABLE_VERSION_CACHE = 'default'
+TABLE_VERSION_CACHE_TIMEOUT = 60
+
+# Leave marks added to existing students in the MarkEntry ledger instead of
+# updating their totals in place, so concurrent entries never wait on a row
+# lock; run `manage.py compact_marks --interval N` to fold them in. Off by default
+DEFERRED_MARK_TOTALS = os.environ.get('DEFERRED_MARK_TOTALS', 'false').lower() == 'true'
+# Ledger entries folded per compaction transaction
+MARK_COMPACTION_BATCH_SIZE = int(os.environ.get('MARK_COMPACTION_BATCH_SIZE', 5000))
+
+# Encode and decode JSON with orjson when it is installed (see portal.codec)
+JSON_USE_ORJSON = os.environ.get('JSON_USE_ORJSON', 'true').lower() != 'false'
+
+# Per-request SQL/view/serialization timings in a Server-Timing header and the
+# portal.timing log (see portal.middleware); off unless REQUEST_TIMING=true
+REQUEST_TIMING = os.environ.get('REQUEST_TIMING', 'false').lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'portal.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Prometheus metrics collected by portal.middleware.MetricsMiddleware and
+# served at /metrics; off unless METRICS=true. Set PROMETHEUS_MULTIPROC_DIR to
+# aggregate across uvicorn workers, and METRICS_TOKEN to require
+# "Authorization: Bearer <token>", which /metrics insists on unless DEBUG is on
+METRICS = os.environ.get('METRICS', 'false').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Teacher, Student
+from .models import Teacher, Student, MarkEntry, StudentTombstone, Subject, SubjectSummary
 
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
@@ -8,6 +8,75 @@ class TeacherAdmin(admin.ModelAdmin):
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'subject', 'marks')
-    list_filter = ('subject',)
-    search_fields = ('name', 'subject')
+    """
+    Writes go through StudentManager, so admin edits keep the ledger, subject
+    summaries, tombstones, versions and list caches in step like the API does.
+    """
+    list_display = ('name', 'subject', 'marks', 'teacher')
+    list_filter = ('subject', 'teacher')
+    search_fields = ('name', 'subject__name')
+    readonly_fields = ('updated_at', 'version')
+
+    def get_readonly_fields(self, request, obj=None):
+        # update_student only writes a teacher's own students
+        if obj is not None:
+            return ('teacher',) + self.readonly_fields
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            Student.objects.add_marks(obj.teacher, obj.name, obj.subject.name, obj.marks)
+            obj.pk, obj.version = Student.objects.filter(
+                teacher=obj.teacher, name=obj.name, subject=obj.subject,
+            ).values_list('pk', 'version').get()
+            return
+        changed = {field: getattr(obj, field) for field in ('name', 'marks') if field in form.changed_data}
+        if 'subject' in form.changed_data:
+            changed['subject'] = obj.subject.name
+        if changed:
+            obj.version = Student.objects.update_student(obj.teacher, obj.pk, **changed)
+
+    def get_deleted_objects(self, objs, request):
+        # delete_students removes the ledger entries itself, which the admin may not delete
+        deleted_objects, model_count, perms_needed, protected = super().get_deleted_objects(objs, request)
+        perms_needed.discard(MarkEntry._meta.verbose_name)
+        return deleted_objects, model_count, perms_needed, protected
+
+    def delete_model(self, request, obj):
+        Student.objects.delete_student(obj.teacher, obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        for teacher in Teacher.objects.filter(pk__in=queryset.values('teacher')):
+            Student.objects.delete_students(teacher, queryset)
+
+@admin.register(MarkEntry)
+class MarkEntryAdmin(admin.ModelAdmin):
+    """
+    The ledger is append-only: entries are written by StudentManager and only
+    marked applied by compaction, so they can be browsed but not edited.
+    """
+    list_display = ('student', 'marks', 'created_at', 'applied')
+    list_filter = ('applied',)
+    raw_id_fields = ('student',)
+    readonly_fields = ('student', 'marks', 'created_at', 'applied')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(StudentTombstone)
+class StudentTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('student_id', 'teacher', 'deleted_at')
+    list_filter = ('teacher',)
+
+@admin.register(Subject)
+class SubjectAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+@admin.register(SubjectSummary)
+class SubjectSummaryAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'teacher', 'count', 'total', 'min_marks', 'max_marks')
+    search_fields = ('subject__name',)
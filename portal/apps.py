@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class PortalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portal'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401
+        from .timing import install_sql_timer
+
+        # Every connection, including those of sync_to_async threads, reports
+        # SQL time to whichever request is being timed
+        connection_created.connect(install_sql_timer)
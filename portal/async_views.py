@@ -0,0 +1,146 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.views import View
+from django.shortcuts import redirect
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from .cache import aget_student_page
+from .codec import JsonResponse
+from .events import current_receive, event_stream
+from .models import Student, TableVersion
+from .validation import clean_student_data, clean_student_patch, clean_version, parse_json_body
+from .views import (
+    save_student_update, stream_student_list, student_changes, student_list_etag, student_list_last_modified, student_list_page,
+    wants_stream,
+)
+
+# Django 4.2 only ships sync session/auth lookups, sync transactions and sync-only
+# condition()/cache_control() decorators, so the async views below resolve the user
+# and run transactional manager methods through sync_to_async. They keep the default
+# thread_sensitive=True: database connections are per thread and are only closed at
+# the end of the request in that thread, and every ASGI request already runs in its
+# own thread-sensitive context, so requests still overlap on one worker.
+
+async def is_authenticated(request):
+    """Resolves request.user off the event loop and reports if it is logged in."""
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+class AsyncStudentListView(View):
+    """Async variant of StudentListView with the same filters, paging and validators."""
+    async def get(self, request):
+        """Returns JSON page of students after the given cursor."""
+        if not await is_authenticated(request):
+            return redirect('portal:login')
+        if wants_stream(request):
+            return stream_student_list(request)
+
+        # Prime the per-request version so the validator helpers do no sync queries
+        request._student_version = await TableVersion.objects.acached_version(
+            TableVersion.student_table(request.user.pk)
+        )
+        etag = quote_etag(student_list_etag(request))
+        last_modified = student_list_last_modified(request)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            version, _ = request._student_version
+            payload, status, hit = await aget_student_page(
+                request.user.pk, version, request.GET, sync_to_async(partial(student_list_page, request.user)),
+            )
+            response = JsonResponse(payload, status=status)
+            response['X-Cache'] = 'HIT' if hit else 'MISS'
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+class AsyncStudentChangesView(View):
+    """Async variant of StudentChangesView."""
+    async def get(self, request):
+        """Returns JSON changes and the token to poll with next."""
+        if not await is_authenticated(request):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        payload, status = await sync_to_async(student_changes)(request.user, request.GET)
+        response = JsonResponse(payload, status=status)
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+class StudentEventsView(View):
+    """Streams the user's student add/update/delete events as Server-Sent Events."""
+    async def get(self, request):
+        """Opens an event stream that lasts until the client disconnects."""
+        if not await is_authenticated(request):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        # request.user was resolved above, before the stream releases the request's thread
+        response = StreamingHttpResponse(
+            event_stream(request.user.pk, current_receive()), content_type='text/event-stream',
+        )
+        patch_cache_control(response, private=True, no_cache=True)
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAddStudentView(View):
+    """Async variant of AddStudentView."""
+    async def post(self, request):
+        """Processes add student request."""
+        if not await is_authenticated(request):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        data, error = parse_json_body(request)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        cleaned, error = clean_student_data(data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        await sync_to_async(Student.objects.add_marks)(
+            request.user, cleaned['name'], cleaned['subject'], cleaned['marks']
+        )
+        return JsonResponse({'message': 'Student added/updated successfully'}, status=200)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncUpdateStudentView(View):
+    """Async variant of UpdateStudentView."""
+    async def post(self, request, id):
+        """Processes update student request."""
+        return await self.update(request, id, clean_student_data)
+
+    async def patch(self, request, id):
+        """Processes partial update student request."""
+        return await self.update(request, id, clean_student_patch)
+
+    async def update(self, request, id, clean):
+        """Validates the body with clean and updates the student, checking If-Match or "version" if sent."""
+        if not await is_authenticated(request):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        data, error = parse_json_body(request)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        cleaned, error = clean(data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        version, error = clean_version(request, data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        return await sync_to_async(save_student_update)(request.user, id, cleaned, version)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncDeleteStudentView(View):
+    """Async variant of DeleteStudentView."""
+    async def post(self, request, id):
+        """Processes delete student request."""
+        if not await is_authenticated(request):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        if not await sync_to_async(Student.objects.delete_student)(request.user, id):
+            return JsonResponse({'error': 'Student not found'}, status=404)
+        return JsonResponse({'message': 'Student deleted successfully'}, status=200)
+
+async def health_check(request):
+    """Simple health check endpoint that never leaves the event loop."""
+    return HttpResponse("OK", content_type="text/plain")
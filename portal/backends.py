@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def teacher_cache_key(user_id):
+    """Returns the cache key holding the Teacher with the given id."""
+    return f'teacher:{user_id}'
+
+def forget_teacher(user_id):
+    """Drops a cached Teacher so the next request reloads it from the database."""
+    caches[settings.TEACHER_CACHE].delete(teacher_cache_key(user_id))
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that serves request.user from the cache.
+
+    AuthenticationMiddleware resolves the session user on every request;
+    caching the Teacher row removes that SELECT. Entries are dropped when a
+    Teacher is saved or deleted and when it logs out, and the session auth
+    hash is still checked against the cached password hash. Those drops only
+    reach other workers through a shared cache, so settings enable this
+    backend only when REDIS_URL is set.
+    """
+    def get_user(self, user_id):
+        cache = caches[settings.TEACHER_CACHE]
+        key = teacher_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.TEACHER_CACHE_TIMEOUT)
+        return user
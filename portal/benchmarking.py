@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+import math
+import time
+import types
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import include, path
+
+from .urls import build_urlpatterns
+
+
+def bench_urlconf(async_views):
+    """Returns a throwaway URLconf module serving the sync or async portal views."""
+    urlconf = types.ModuleType(f"bench_urls_{'async' if async_views else 'sync'}")
+    urlconf.urlpatterns = [path('', include((build_urlpatterns(async_views), 'portal')))]
+    return urlconf
+
+@contextlib.contextmanager
+def benchmark_database():
+    """Runs the block against a fresh test database with DEBUG query logging off."""
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+def percentile(ordered, pct):
+    """Returns the nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+class ASGIClient:
+    """Sends HTTP requests straight into an ASGI application, without a server."""
+    def __init__(self, application, cookie=b''):
+        self.application = application
+        self.cookie = cookie
+
+    async def request(self, method, path, query=b'', body=b'', cookie=None):
+        """Runs one request through the application and returns (status, body)."""
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query,
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'cookie', self.cookie if cookie is None else cookie),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        response = {'body': []}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The request body was sent in full; wait until the response is done
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.application(scope, receive, send)
+        return response['status'], b''.join(response['body'])
+
+async def run_concurrently(count, concurrency, send):
+    """
+    Calls send(i) for i in range(count) with at most `concurrency` in flight.
+
+    Returns (elapsed seconds, [(status, latency seconds), ...]).
+    """
+    pending = iter(range(count))
+    samples = []
+
+    async def worker():
+        for i in pending:
+            started = time.perf_counter()
+            status = await send(i)
+            samples.append((status, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, count))))
+    return time.perf_counter() - started, samples
@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for one cache, local to this process."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        """Counts one lookup as a hit or a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        """Returns the counters and the hit rate as a dict."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else None}
+
+    def reset(self):
+        """Zeroes the counters."""
+        with self._lock:
+            self.hits = self.misses = 0
+
+student_list_stats = CacheStats()
+
+def is_shared_cache(alias):
+    """Returns whether a cache alias is seen by every worker, i.e. not local to this process."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+def student_list_cache():
+    """Returns the cache backend configured for student list pages."""
+    return caches[settings.STUDENT_LIST_CACHE]
+
+def student_page_key(teacher_id, version, params):
+    """Returns the cache key of a teacher's list page for a version and its query parameters."""
+    query = urlencode([(key, value) for key, values in sorted(params.lists()) for value in values])
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    return f'students:page:{teacher_id}:{version}:{digest}'
+
+def get_student_page(teacher_id, version, params, build_page):
+    """
+    Returns (payload, status, hit) for a teacher's list page, calling build_page(params) on a miss.
+
+    Keys embed the teacher and the version of their students, so a committed
+    write makes every cached page of that teacher unreachable without
+    enumerating them, and other teachers' pages stay cached. Only successful
+    pages are stored.
+    """
+    cache = student_list_cache()
+    key = student_page_key(teacher_id, version, params)
+    payload = cache.get(key)
+    student_list_stats.record(payload is not None)
+    if payload is not None:
+        return payload, 200, True
+    payload, status = build_page(params)
+    if status == 200:
+        cache.set(key, payload, settings.STUDENT_LIST_CACHE_TIMEOUT)
+    return payload, status, False
+
+async def aget_student_page(teacher_id, version, params, build_page):
+    """Async variant of get_student_page; build_page must be a coroutine function."""
+    cache = student_list_cache()
+    key = student_page_key(teacher_id, version, params)
+    payload = await cache.aget(key)
+    student_list_stats.record(payload is not None)
+    if payload is not None:
+        return payload, 200, True
+    payload, status = await build_page(params)
+    if status == 200:
+        await cache.aset(key, payload, settings.STUDENT_LIST_CACHE_TIMEOUT)
+    return payload, status, False
+
+SUBJECT_NAMES_KEY = 'subjects:names'
+
+def get_subject_names():
+    """Returns every subject name in alphabetical order, read through the cache."""
+    cache = student_list_cache()
+    names = cache.get(SUBJECT_NAMES_KEY)
+    if names is None:
+        from .models import Subject
+        names = list(Subject.objects.order_by('name').values_list('name', flat=True))
+        cache.set(SUBJECT_NAMES_KEY, names, settings.SUBJECT_LIST_CACHE_TIMEOUT)
+    return names
+
+def forget_subject_names():
+    """Drops the cached subject names after a subject was added, renamed or removed."""
+    student_list_cache().delete(SUBJECT_NAMES_KEY)
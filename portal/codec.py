@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .timing import current_timings
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib codec
+    orjson = None
+
+_django_encoder = DjangoJSONEncoder()
+
+def use_orjson():
+    """Returns True if orjson is installed and enabled by the JSON_USE_ORJSON setting."""
+    return orjson is not None and settings.JSON_USE_ORJSON
+
+def loads(data):
+    """
+    Decodes a JSON document from bytes or str.
+
+    Both codecs raise json.JSONDecodeError (orjson's error subclasses it),
+    so callers handle one exception type.
+    """
+    if use_orjson():
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj):
+    if use_orjson():
+        return orjson.dumps(obj, default=_django_encoder.default)
+    return json.dumps(obj, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+def dumps(obj):
+    """Encodes obj as compact JSON bytes, handling the types DjangoJSONEncoder handles."""
+    timings = current_timings()
+    if timings is None:
+        return _dumps(obj)
+    started = time.perf_counter()
+    try:
+        return _dumps(obj)
+    finally:
+        timings.serialize += time.perf_counter() - started
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in for django.http.JsonResponse that serializes through dumps().
+
+    Like Django's version, only dicts are accepted unless safe=False.
+    """
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the '
+                'safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
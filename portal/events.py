@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import codec
+
+logger = logging.getLogger('portal.events')
+
+_backend = None
+_backend_lock = threading.Lock()
+
+# The ASGI receive channel of the request being served, set by track_disconnects
+_receive = ContextVar('asgi_receive', default=None)
+
+def encode_event(event_type, data):
+    """Returns one Server-Sent Events frame as bytes, encoded once for every subscriber."""
+    return b'event: ' + event_type.encode() + b'\ndata: ' + codec.dumps(data) + b'\n\n'
+
+# Sent to a subscriber whose queue overflowed, in place of the events it missed
+RESET_FRAME = encode_event('reset', {})
+
+
+class Subscription:
+    """
+    One event stream client: a bounded queue of frames owned by an event loop.
+
+    Frames are shared bytes objects and the queue is a plain deque plus one
+    future while the client waits, so an idle subscription costs under a
+    kilobyte. When a slow client lets the queue fill up its pending frames
+    are dropped and it is sent a single reset event instead, telling it to
+    resynchronize from the change feed; publishers never wait.
+    """
+    __slots__ = ('teacher_id', 'loop', 'maxsize', 'frames', 'waiter', 'closed')
+
+    def __init__(self, teacher_id, maxsize):
+        self.teacher_id = teacher_id
+        self.loop = asyncio.get_running_loop()
+        self.maxsize = maxsize
+        self.frames = deque()
+        self.waiter = None
+        self.closed = False
+
+    def push(self, frame):
+        """Queues a frame; runs on the subscription's event loop."""
+        if self.closed or (self.frames and self.frames[-1] is RESET_FRAME):
+            return
+        if len(self.frames) >= self.maxsize:
+            self.frames.clear()
+            frame = RESET_FRAME
+        self.frames.append(frame)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def close(self):
+        """Drops queued frames and wakes the reader, whose next get() returns None."""
+        self.closed = True
+        self.frames.clear()
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self):
+        """Returns the next frame to send, waiting for one if none is queued, or None once closed."""
+        while not self.frames:
+            if self.closed:
+                return None
+            self.waiter = self.loop.create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        return self.frames.popleft()
+
+
+class EventHub:
+    """In-process registry of subscriptions by teacher, fed by the configured backend."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, teacher_id):
+        """Registers a subscription of the running event loop for a teacher's events."""
+        get_backend().start(self)
+        subscription = Subscription(teacher_id, settings.STUDENT_EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.setdefault(teacher_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Removes a subscription."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.teacher_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.teacher_id]
+
+    def subscriber_count(self):
+        """Returns the number of subscriptions in this process."""
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def deliver(self, teacher_id, frame):
+        """Hands a frame to every subscription of a teacher; callable from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(teacher_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, frame)
+            except RuntimeError:
+                # The subscription's loop has closed
+                self.unsubscribe(subscription)
+
+hub = EventHub()
+
+
+class LocalBackend:
+    """Delivers events to subscribers in this process only; enough for a single worker."""
+    def start(self, hub):
+        pass
+
+    def publish(self, teacher_id, frame):
+        hub.deliver(teacher_id, frame)
+
+
+class RedisBackend:
+    """
+    Fans events out to every worker through a Redis pub/sub channel.
+
+    Needs the redis package and REDIS_URL. Each process listening for
+    events runs one thread that delivers what it receives to its own hub.
+    """
+    channel = 'portal:student-events'
+    # Seconds before resubscribing after the connection drops, doubled per
+    # consecutive failure up to the maximum
+    reconnect_delay = 0.5
+    max_reconnect_delay = 30
+
+    def __init__(self):
+        import redis
+        self.client = redis.Redis.from_url(settings.REDIS_URL)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self, hub):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self.listen, args=(hub,), name='student-events', daemon=True,
+                )
+                self._listener.start()
+
+    def listen(self, hub):
+        """
+        Delivers messages from the channel to the hub until the process exits.
+
+        A dropped connection is logged and the channel resubscribed with
+        exponential backoff; events published meanwhile are lost, which
+        clients recover from through the change feed. Should the thread stop
+        anyway, the next start() replaces it.
+        """
+        delay = self.reconnect_delay
+        try:
+            while True:
+                try:
+                    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                    try:
+                        pubsub.subscribe(self.channel)
+                        delay = self.reconnect_delay
+                        for message in pubsub.listen():
+                            teacher_id, _, frame = message['data'].partition(b' ')
+                            hub.deliver(int(teacher_id), frame)
+                    finally:
+                        pubsub.close()
+                except Exception:
+                    logger.exception('Lost the student events channel; resubscribing in %s seconds', delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            with self._lock:
+                self._listener = None
+
+    def publish(self, teacher_id, frame):
+        self.client.publish(self.channel, str(teacher_id).encode() + b' ' + frame)
+
+
+def get_backend():
+    """Returns the STUDENT_EVENTS_BACKEND instance, created on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.STUDENT_EVENTS_BACKEND)()
+        return _backend
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    """Recreates the backend when STUDENT_EVENTS_BACKEND is overridden."""
+    global _backend
+    if setting == 'STUDENT_EVENTS_BACKEND':
+        with _backend_lock:
+            _backend = None
+
+def publish_student_event(teacher_id, event_type, data):
+    """
+    Publishes a student event to the teacher's subscribers in every process.
+
+    Called after the write commits; a backend failure is not allowed to fail
+    the write, since clients also resynchronize from the change feed.
+    """
+    try:
+        get_backend().publish(teacher_id, encode_event(event_type, data))
+    except Exception:
+        logger.exception('Could not publish a %s event', event_type)
+
+def publish_on_commit(teacher_id, event_type, data, using=None):
+    """Publishes a student event once the current transaction commits."""
+    transaction.on_commit(lambda: publish_student_event(teacher_id, event_type, data), using=using)
+
+def track_disconnects(application):
+    """
+    Wraps an ASGI application so event streams can notice their client leaving.
+
+    Django 4.2 stops reading the receive channel once the request body is in
+    and servers drop writes to a closed connection silently, so a stream
+    cannot tell by sending. The wrapper makes the channel available to
+    event_stream, which waits on it for http.disconnect.
+    """
+    async def app(scope, receive, send):
+        token = _receive.set(receive)
+        try:
+            await application(scope, receive, send)
+        finally:
+            _receive.reset(token)
+    return app
+
+def current_receive():
+    """Returns the ASGI receive channel of the current request, or None outside track_disconnects."""
+    return _receive.get()
+
+async def close_on_disconnect(receive, subscription):
+    """Closes a subscription once its client disconnects."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    subscription.close()
+
+def release_request_thread():
+    """
+    Stops the worker thread sync_to_async keeps for the current request.
+
+    ASGIHandler runs each request in a ThreadSensitiveContext, whose thread
+    (started by the session and auth middleware) otherwise lives as long as
+    the response. A later thread-sensitive call in the request, such as
+    closing the response, starts a new one.
+    """
+    context = SyncToAsync.thread_sensitive_context.get(None)
+    if context is not None:
+        executor = SyncToAsync.context_to_thread_executor.pop(context, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+async def event_stream(teacher_id, receive=None):
+    """
+    Yields a teacher's event frames, with comment keepalives while the stream is idle.
+
+    The stream ends when the client disconnects, noticed on the ASGI receive
+    channel if one is given, and otherwise after STUDENT_EVENTS_MAX_AGE
+    seconds, after which the browser reconnects.
+    """
+    # Subscribed on first iteration, so a response that is never sent leaks nothing;
+    # by then the middleware have run, so the request no longer needs its thread
+    subscription = hub.subscribe(teacher_id)
+    release_request_thread()
+    watcher = None
+    if receive is not None:
+        watcher = asyncio.ensure_future(close_on_disconnect(receive, subscription))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.STUDENT_EVENTS_MAX_AGE
+    try:
+        yield f'retry: {settings.STUDENT_EVENTS_RETRY * 1000}\n\n'.encode()
+        while loop.time() < deadline:
+            try:
+                frame = await asyncio.wait_for(subscription.get(), settings.STUDENT_EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if frame is None:
+                return
+            yield frame
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        hub.unsubscribe(subscription)
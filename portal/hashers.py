@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_executor = None
+_executor_lock = threading.Lock()
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 hasher whose cost comes from the ARGON2_* settings.
+
+    Raising a cost makes existing hashes report must_update, so they are
+    upgraded on the next successful login.
+    """
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+def hash_executor():
+    """Returns the bounded pool that runs password hashing."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='password-hash',
+            )
+        return _executor
+
+def run_hashing(func, *args):
+    """
+    Runs a password hashing call in the bounded pool and waits for its result.
+
+    PBKDF2 and Argon2 release the GIL while hashing, so the pool gives real
+    parallelism up to PASSWORD_HASH_WORKERS and makes a login burst queue
+    instead of starving every request thread of CPU.
+    """
+    return hash_executor().submit(func, *args).result()
+
+@receiver(setting_changed)
+def reset_hash_executor(setting, **kwargs):
+    """Rebuilds the pool when PASSWORD_HASH_WORKERS is overridden."""
+    global _executor
+    if setting == 'PASSWORD_HASH_WORKERS':
+        with _executor_lock:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = None
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import platform
+import subprocess
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from portal.benchmarking import ASGIClient, bench_urlconf, benchmark_database, percentile, run_concurrently
+from portal.models import Student, Teacher
+
+ENDPOINTS = ('login', 'list', 'add', 'update', 'delete')
+PASSWORD = 'BenchPass123'
+# Result fields compared against a baseline, and whether higher is better
+COMPARED_FIELDS = (('throughput', True), ('p95_ms', False))
+
+
+class Command(BaseCommand):
+    """Load-tests the portal endpoints in-process and reports latency percentiles as JSON."""
+    help = (
+        'Seed teachers and students in a throwaway test database, drive the ASGI '
+        'application in-process with concurrent clients, and report throughput and '
+        'p50/p95/p99 latency per endpoint as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--teachers', type=int, default=10,
+            help='Teachers seeded; students and client sessions are spread across them (default: 10).',
+        )
+        parser.add_argument(
+            '--students', type=int, default=2000,
+            help='Students seeded before the run (default: 2000).',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests sent per endpoint (default: 500).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Requests kept in flight at once (default: 16).',
+        )
+        parser.add_argument(
+            '--endpoint', action='append', choices=ENDPOINTS,
+            help='Endpoint to run; repeat to run several (default: all, in the order listed).',
+        )
+        parser.add_argument(
+            '--views', choices=('settings', 'sync', 'async'), default='settings',
+            help='View set to serve: as configured by ASYNC_VIEWS (default), sync or async.',
+        )
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help="File to write the JSON report to, or '-' for stdout (default).",
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON report of an earlier run; fail if any endpoint regressed past --threshold.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Relative throughput drop or p95 rise counted as a regression (default: 0.2).',
+        )
+
+    def handle(self, *args, **options):
+        for option in ('teachers', 'requests', 'concurrency'):
+            if options[option] < 1:
+                raise CommandError(f'--{option} must be at least 1')
+        endpoints = [endpoint for endpoint in ENDPOINTS if endpoint in (options['endpoint'] or ENDPOINTS)]
+        if 'delete' in endpoints and options['students'] < options['requests']:
+            raise CommandError('--students must be at least --requests to benchmark delete')
+        if 'update' in endpoints and options['students'] < options['teachers']:
+            raise CommandError('--students must be at least --teachers to benchmark update')
+        baseline = self.load_baseline(options['baseline']) if options['baseline'] else None
+
+        async_views = settings.ASYNC_VIEWS if options['views'] == 'settings' else options['views'] == 'async'
+        with benchmark_database(), override_settings(ROOT_URLCONF=bench_urlconf(async_views)):
+            self.seed(options['teachers'], options['students'])
+            client = ASGIClient(get_asgi_application())
+            results = {}
+            for endpoint in endpoints:
+                elapsed, samples = asyncio.run(run_concurrently(
+                    options['requests'], options['concurrency'],
+                    lambda i: self.send(client, endpoint, i),
+                ))
+                results[endpoint] = self.summarize(elapsed, samples)
+                if options['verbosity'] > 1:
+                    self.stderr.write(f"{endpoint}: {results[endpoint]['throughput']} req/s")
+            vendor = connection.vendor
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': vendor,
+                'views': 'async' if async_views else 'sync',
+                'teachers': options['teachers'],
+                'students': options['students'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+            },
+            'endpoints': results,
+        }
+        self.write_report(report, options['output'])
+        if baseline is not None:
+            self.check_regressions(baseline, report, options['threshold'])
+
+    def seed(self, teachers, students):
+        """Creates teachers sharing one password hash, their students and a session per teacher."""
+        encoded = make_password(PASSWORD)
+        Teacher.objects.bulk_create([
+            Teacher(username=f'bench{i}', password=encoded) for i in range(teachers)
+        ])
+        self.cookies = []
+        self.students = []
+        for index, teacher in enumerate(Teacher.objects.order_by('id')):
+            # Student i belongs to teacher i % teachers, which is also who requests it
+            Student.objects.bulk_add_marks(teacher, [
+                {'name': f'Student {i}', 'subject': f'Subject {i % 20}', 'marks': i % 101}
+                for i in range(index, students, teachers)
+            ])
+            self.students.append(list(
+                Student.objects.filter(teacher=teacher).order_by('id').values_list('id', 'name', 'subject__name')
+            ))
+            client = Client()
+            client.force_login(teacher)
+            self.cookies.append(f"sessionid={client.cookies['sessionid'].value}".encode())
+        self.teachers = teachers
+
+    async def send(self, client, endpoint, i):
+        """Sends the i-th request to an endpoint and returns its status."""
+        cookie = self.cookies[i % self.teachers]
+        students = self.students[i % self.teachers]
+        if endpoint == 'login':
+            body = {'username': f'bench{i % self.teachers}', 'password': PASSWORD}
+            status, _ = await client.request('POST', '/login/', body=json.dumps(body).encode(), cookie=b'')
+        elif endpoint == 'list':
+            query = b'limit=100' if i % 2 else urlencode({'subject': f'Subject {i % 20}', 'ordering': '-marks'}).encode()
+            status, _ = await client.request('GET', '/students/', query, cookie=cookie)
+        elif endpoint == 'add':
+            body = {'name': f'Bench {i % 500}', 'subject': 'Benchmark', 'marks': 1}
+            status, _ = await client.request('POST', '/student/', body=json.dumps(body).encode(), cookie=cookie)
+        elif endpoint == 'update':
+            student_id, name, subject = students[i // self.teachers % len(students)]
+            body = {'name': name, 'subject': subject, 'marks': i % 101}
+            status, _ = await client.request(
+                'POST', f'/student/{student_id}/', body=json.dumps(body).encode(), cookie=cookie
+            )
+        else:
+            # Each delete removes a distinct seeded student of the requesting teacher
+            student_id, _, _ = students[i // self.teachers]
+            status, _ = await client.request('POST', f'/student/{student_id}/delete/', cookie=cookie)
+        return status
+
+    def summarize(self, elapsed, samples):
+        """Returns the throughput and latency percentiles of one endpoint run."""
+        latencies = sorted(latency * 1000 for _, latency in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for status, _ in samples if status >= 400),
+            'seconds': round(elapsed, 3),
+            'throughput': round(len(samples) / elapsed, 1),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+        }
+
+    def git_commit(self):
+        """Returns the checked out commit, or None outside a git checkout."""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def load_baseline(self, path):
+        """Reads an earlier JSON report."""
+        try:
+            with open(path, encoding='utf-8') as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+
+    def write_report(self, report, output):
+        """Writes the report as indented JSON to a file or stdout."""
+        text = json.dumps(report, indent=2)
+        if output == '-':
+            self.stdout.write(text)
+            return
+        with open(output, 'w', encoding='utf-8') as destination:
+            destination.write(text + '\n')
+
+    def check_regressions(self, baseline, report, threshold):
+        """Raises CommandError listing endpoints that got worse than the baseline."""
+        regressions = []
+        for endpoint, current in report['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(endpoint)
+            if not previous:
+                continue
+            for field, higher_is_better in COMPARED_FIELDS:
+                old, new = previous.get(field), current[field]
+                if not old:
+                    continue
+                change = (new - old) / old
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(f'{endpoint} {field}: {old} -> {new} ({change:+.0%})')
+        if regressions:
+            raise CommandError('Performance regressed against the baseline:\n' + '\n'.join(regressions))
+        self.stderr.write('No regressions against the baseline.')
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import random
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from portal.benchmarking import ASGIClient, bench_urlconf, benchmark_database, run_concurrently
+from portal.models import Student, Teacher
+
+SCENARIOS = ('list', 'add', 'update', 'health')
+
+
+class Command(BaseCommand):
+    """Compares sync and async view throughput through the ASGI application."""
+    help = (
+        'Benchmark the sync and async student views by driving the ASGI application '
+        'in-process with concurrent clients against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Requests sent per scenario and view set (default: 1000).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Requests kept in flight at once (default: 32).',
+        )
+        parser.add_argument(
+            '--students', type=int, default=1000,
+            help='Students seeded before the run (default: 1000).',
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Scenario to run; repeat to run several (default: all).',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        scenarios = options['scenario'] or SCENARIOS
+
+        with benchmark_database():
+            client = ASGIClient(get_asgi_application(), self.seed(options['students']))
+            for scenario in scenarios:
+                for async_views in (False, True):
+                    with override_settings(ROOT_URLCONF=bench_urlconf(async_views)):
+                        elapsed, samples = asyncio.run(run_concurrently(
+                            options['requests'], options['concurrency'],
+                            lambda i: self.send(client, scenario, i),
+                        ))
+                    errors = sum(1 for status, _ in samples if status >= 400)
+                    self.stdout.write(
+                        f"{'async' if async_views else 'sync':<5} {scenario:<6} "
+                        f'{len(samples)} requests in {elapsed:.2f}s ({len(samples) / elapsed:.0f} req/s), '
+                        f'{errors} errors'
+                    )
+
+    def seed(self, students):
+        """Creates the benchmark teacher and students, returning a session cookie."""
+        teacher = Teacher.objects.create_user(username='bench', password='bench-password')
+        Student.objects.bulk_add_marks(teacher, [
+            {'name': f'Student {i}', 'subject': f'Subject {i % 10}', 'marks': i % 100}
+            for i in range(students)
+        ])
+        self.students = list(Student.objects.values_list('id', 'name', 'subject__name'))
+        client = Client()
+        client.force_login(teacher)
+        return f"sessionid={client.cookies['sessionid'].value}".encode()
+
+    async def send(self, client, scenario, i):
+        """Sends the i-th request of a scenario and returns its status."""
+        if scenario == 'list':
+            status, _ = await client.request('GET', '/students/', b'limit=50')
+        elif scenario == 'add':
+            body = {'name': f'Bench {i % 200}', 'subject': 'Benchmark', 'marks': 1}
+            status, _ = await client.request('POST', '/student/', body=json.dumps(body).encode())
+        elif scenario == 'update':
+            student_id, name, subject = random.choice(self.students)
+            body = {'name': name, 'subject': subject, 'marks': i % 100}
+            status, _ = await client.request('POST', f'/student/{student_id}/', body=json.dumps(body).encode())
+        else:
+            status, _ = await client.request('GET', '/health/')
+        return status
@@ -0,0 +1,86 @@
+import json
+import re
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse as DjangoJsonResponse, QueryDict
+from django.test import override_settings
+
+from portal import codec
+from portal.codec import JsonResponse
+from portal.models import Teacher
+from portal.validation import clean_student_data
+from portal.views import filter_students, parse_page_params
+
+ADD_BODY = b'{"name": "John Doe", "subject": "Mathematics", "marks": 85}'
+LIST_QUERY = 'subject=Mathematics&ordering=-marks&limit=100'
+
+
+def legacy_add(body):
+    """The pre-codec /student/ path: json.loads, per-call re.match and Django's JsonResponse."""
+    data = json.loads(body)
+    for value in (data.get('name'), data.get('subject')):
+        if isinstance(value, str) and not re.match(r'^[a-zA-Z0-9\s]+$', value):
+            break
+    int(data.get('marks'))
+    return DjangoJsonResponse({'message': 'Student added/updated successfully'}).content
+
+def codec_add(body):
+    """The /student/ request path without the database write."""
+    cleaned, _ = clean_student_data(codec.loads(body))
+    return JsonResponse({'message': 'Student added/updated successfully'}).content
+
+def make_list_handler(response_class, page):
+    """Returns the /students/ request path without the query, for a response class."""
+    def handle(query):
+        params = QueryDict(query)
+        _, ordering = filter_students(Teacher(pk=1), params)
+        parse_page_params(params, ordering)
+        return response_class({'results': page, 'next': '85:100'}).content
+    return handle
+
+
+class Command(BaseCommand):
+    """Times JSON parse, validation and serialization for the student endpoints."""
+    help = (
+        'Microbenchmark the per-request parse + validate + serialize cost of /student/ '
+        'and /students/ (no database access) for the legacy path, the stdlib codec and orjson.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=5000,
+            help='Calls timed per measurement (default: 5000).',
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=100,
+            help='Students serialized per /students/ page (default: 100).',
+        )
+
+    def handle(self, *args, **options):
+        if options['number'] < 1 or options['page_size'] < 1:
+            raise CommandError('--number and --page-size must be at least 1')
+        page = [
+            {'id': i, 'name': f'Student {i}', 'subject': 'Mathematics', 'marks': i % 101}
+            for i in range(options['page_size'])
+        ]
+        variants = [('legacy', False, legacy_add, make_list_handler(DjangoJsonResponse, page))]
+        variants.append(('stdlib', False, codec_add, make_list_handler(JsonResponse, page)))
+        if codec.orjson is not None:
+            variants.append(('orjson', True, codec_add, make_list_handler(JsonResponse, page)))
+        else:
+            self.stderr.write('orjson is not installed; skipping the orjson codec')
+
+        for name, use_orjson, add, list_page in variants:
+            with override_settings(JSON_USE_ORJSON=use_orjson):
+                add_cost = self.time_call(add, ADD_BODY, options['number'])
+                list_cost = self.time_call(list_page, LIST_QUERY, options['number'])
+            self.stdout.write(
+                f'{name:<6} /student/ {add_cost:7.1f} us/request   '
+                f"/students/ ({options['page_size']} rows) {list_cost:7.1f} us/request"
+            )
+
+    def time_call(self, func, arg, number):
+        """Returns the best per-call time of func(arg) in microseconds."""
+        best = min(timeit.repeat(lambda: func(arg), number=number, repeat=3))
+        return best / number * 1e6
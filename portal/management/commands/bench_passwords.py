@@ -0,0 +1,66 @@
+import os
+import time
+from concurrent.futures import wait
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from portal.hashers import hash_executor
+
+PASSWORD = 'Bench-password-123'
+
+
+class Command(BaseCommand):
+    """Measures password check throughput for each PASSWORD_HASHER_PROFILES entry."""
+    help = (
+        'Benchmark logins per second for each password hashing profile, on one '
+        'core and through the bounded hashing pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins', type=int, default=20,
+            help='Password checks timed per core (default: 20).',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Hashing pool size for the pooled run (default: CPU count).',
+        )
+        parser.add_argument(
+            '--profile', action='append', choices=sorted(settings.PASSWORD_HASHER_PROFILES),
+            help='Profile to run; repeat to run several (default: all).',
+        )
+
+    def handle(self, *args, **options):
+        if options['logins'] < 1 or options['workers'] < 1:
+            raise CommandError('--logins and --workers must be at least 1')
+        for profile in options['profile'] or settings.PASSWORD_HASHER_PROFILES:
+            hashers = settings.PASSWORD_HASHER_PROFILES[profile]
+            with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASH_WORKERS=options['workers']):
+                try:
+                    encoded = make_password(PASSWORD)
+                except ValueError as exc:
+                    self.stderr.write(f'{profile}: skipped ({exc})')
+                    continue
+                per_core = self.time_serial(encoded, options['logins'])
+                pooled = self.time_pooled(encoded, options['logins'] * options['workers'])
+                self.stdout.write(
+                    f"{profile:<7} {get_hasher().algorithm:<13} {per_core:.1f} logins/s per core, "
+                    f"{pooled:.1f} logins/s with {options['workers']} hashing workers"
+                )
+
+    def time_serial(self, encoded, logins):
+        """Returns password checks per second on the calling thread."""
+        started = time.perf_counter()
+        for _ in range(logins):
+            check_password(PASSWORD, encoded)
+        return logins / (time.perf_counter() - started)
+
+    def time_pooled(self, encoded, logins):
+        """Returns password checks per second through the bounded hashing pool."""
+        executor = hash_executor()
+        started = time.perf_counter()
+        wait([executor.submit(check_password, PASSWORD, encoded) for _ in range(logins)])
+        return logins / (time.perf_counter() - started)
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from portal.models import MarkEntry
+
+# Pause before retrying a batch that lost a lock race (SQLite "database is locked")
+RETRY_DELAY = 0.5
+
+
+class Command(BaseCommand):
+    """Folds pending MarkEntry ledger entries into the student totals."""
+    help = (
+        'Apply marks left in the ledger by DEFERRED_MARK_TOTALS to Student.marks and '
+        'the subject summaries. Runs until the ledger is caught up, or with --interval '
+        'keeps running as a background worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MARK_COMPACTION_BATCH_SIZE,
+            help=f'Entries folded per transaction (default: {settings.MARK_COMPACTION_BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds to sleep once caught up before compacting again; 0 exits instead (default).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size, interval = options['batch_size'], options['interval']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if interval < 0:
+            raise CommandError('--interval must not be negative')
+        try:
+            while True:
+                folded = self.compact(batch_size)
+                if folded or options['verbosity'] > 1:
+                    self.stdout.write(f'Folded {folded} mark entries.')
+                if not interval:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def compact(self, batch_size):
+        """Folds batches until one comes back short, returning the entries folded."""
+        folded = 0
+        while True:
+            try:
+                count = MarkEntry.objects.compact(batch_size)
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                time.sleep(RETRY_DELAY)
+                continue
+            folded += count
+            if count < batch_size:
+                return folded
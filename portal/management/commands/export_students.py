@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.models import Student
+from portal.streaming import CSVStreamEncoder, stream_rows
+
+EXPORT_FIELDS = ('id', 'name', 'subject', 'marks')
+
+
+class Command(BaseCommand):
+    """Streams the Student table to a CSV file."""
+    help = 'Export students as CSV, streamed from a server-side cursor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help="Destination CSV file, or '-' for stdout (default).",
+        )
+        parser.add_argument('--teacher', help='Only export the students of this username.')
+        parser.add_argument('--subject', help='Only export students of this subject.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Rows fetched per database round-trip (default: 2000).',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        students = Student.objects.all()
+        if options['teacher']:
+            students = students.filter(teacher__username=options['teacher'])
+        if options['subject']:
+            students = students.filter(subject__name=options['subject'])
+        students = students.order_by('id').values_list('id', 'name', 'subject__name', 'marks')
+
+        to_stdout = options['output'] == '-'
+        try:
+            output = self.stdout if to_stdout else open(options['output'], 'w', newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot open {options['output']}: {exc}")
+
+        started = time.monotonic()
+        encoder = CSVStreamEncoder(EXPORT_FIELDS)
+        try:
+            for chunk in stream_rows(students, encoder, options['chunk_size']):
+                if to_stdout:
+                    output.write(chunk, ending='')
+                else:
+                    output.write(chunk)
+        finally:
+            if not to_stdout:
+                output.close()
+
+        elapsed = time.monotonic() - started
+        self.stderr.write(f'Exported {encoder.rows} rows in {elapsed:.2f}s')
@@ -0,0 +1,111 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.models import Student, Teacher
+from portal.validation import clean_student_data
+
+REQUIRED_COLUMNS = ('name', 'subject', 'marks')
+
+
+class Command(BaseCommand):
+    """Streams a CSV roster into a teacher's students in batches."""
+    help = (
+        "Import a teacher's students from a CSV file with name, subject and marks columns. "
+        'Marks are added to existing students, like the add student endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="Path to the CSV file, or '-' for stdin.")
+        parser.add_argument(
+            '--teacher', required=True,
+            help='Username of the teacher the students belong to.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows written per transaction (default: 1000).',
+        )
+        parser.add_argument(
+            '--delimiter', default=',',
+            help='CSV field delimiter (default: ,).',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Write rejected rows to this CSV file with their line number and error.',
+        )
+        parser.add_argument(
+            '--max-errors', type=int, default=10,
+            help='Rejected rows echoed to stderr when --rejects is not given (default: 10).',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        try:
+            self.teacher = Teacher.objects.get(username=options['teacher'])
+        except Teacher.DoesNotExist:
+            raise CommandError(f"No teacher with username {options['teacher']}")
+        try:
+            source = sys.stdin if options['file'] == '-' else open(options['file'], newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot open {options['file']}: {exc}")
+
+        rejects_file = None
+        try:
+            reader = csv.DictReader(source, delimiter=options['delimiter'])
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise CommandError(f"Missing CSV column(s): {', '.join(missing)}")
+
+            rejects = None
+            if options['rejects']:
+                rejects_file = open(options['rejects'], 'w', newline='', encoding='utf-8')
+                rejects = csv.writer(rejects_file)
+                rejects.writerow(['line', 'error', *REQUIRED_COLUMNS])
+            self.import_rows(reader, options['batch_size'], rejects, options['max_errors'])
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if rejects_file:
+                rejects_file.close()
+
+    def import_rows(self, reader, batch_size, rejects, max_errors):
+        """Validates and writes rows batch by batch, keeping only one batch in memory."""
+        started = time.monotonic()
+        batch = []
+        imported = created = rejected = 0
+
+        for row in reader:
+            cleaned, error = clean_student_data({column: row.get(column) for column in REQUIRED_COLUMNS})
+            if error:
+                rejected += 1
+                self.reject(rejects, reader.line_num, error, row, rejected, max_errors)
+                continue
+            batch.append(cleaned)
+            if len(batch) >= batch_size:
+                created += Student.objects.bulk_add_marks(self.teacher, batch).count('created')
+                imported += len(batch)
+                batch = []
+                if self.verbosity >= 2:
+                    self.stdout.write(f'{imported} rows imported...')
+        if batch:
+            created += Student.objects.bulk_add_marks(self.teacher, batch).count('created')
+            imported += len(batch)
+
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed > 0 else float(imported)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} rows ({created} created, {imported - created} updated), '
+            f'rejected {rejected} in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
+
+    def reject(self, rejects, line, error, row, rejected, max_errors):
+        """Records a rejected row in the rejects file or on stderr."""
+        values = [row.get(column) for column in REQUIRED_COLUMNS]
+        if rejects is not None:
+            rejects.writerow([line, error, *values])
+        elif rejected <= max_errors:
+            self.stderr.write(f'Line {line}: {error}: {values}')
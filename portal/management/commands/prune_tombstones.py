@@ -0,0 +1,28 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from portal.models import StudentTombstone
+
+
+class Command(BaseCommand):
+    """Deletes student tombstones the change feed no longer serves."""
+    help = (
+        'Delete tombstones of students removed longer ago than STUDENT_TOMBSTONE_RETENTION. '
+        'Change tokens that old are answered with 410, so clients reload the list instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention', type=int, default=settings.STUDENT_TOMBSTONE_RETENTION,
+            help=f'Seconds to keep tombstones for (default: {settings.STUDENT_TOMBSTONE_RETENTION}).',
+        )
+
+    def handle(self, *args, **options):
+        if options['retention'] < 0:
+            raise CommandError('--retention must not be negative')
+        before = timezone.now() - datetime.timedelta(seconds=options['retention'])
+        deleted = StudentTombstone.objects.prune(before)
+        self.stdout.write(f'Deleted {deleted} tombstones.')
@@ -0,0 +1,57 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+SQLITE_SIZES = '''
+    SELECT name, SUM(pgsize) FROM dbstat
+    WHERE name IN (
+        SELECT name FROM sqlite_master WHERE tbl_name = %s AND type IN ('table', 'index')
+    )
+    GROUP BY name
+'''
+POSTGRES_SIZES = '''
+    SELECT c.relname, pg_relation_size(c.oid) FROM pg_class c
+    WHERE c.oid = %s::regclass
+    OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = %s::regclass)
+'''
+
+
+class Command(BaseCommand):
+    """Reports the on-disk size of the portal tables and each of their indexes."""
+    help = (
+        'Print the bytes used by every portal table and its indexes, to compare '
+        'schema changes on a copy of production data. Supports SQLite (needs the '
+        'dbstat table) and PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append',
+            help='Only report this table (e.g. portal_student); repeat for several.',
+        )
+
+    def handle(self, *args, **options):
+        tables = options['table'] or [
+            model._meta.db_table for model in apps.get_app_config('portal').get_models()
+        ]
+        if connection.vendor == 'sqlite':
+            query, params = SQLITE_SIZES, lambda table: [table]
+        elif connection.vendor == 'postgresql':
+            query, params = POSTGRES_SIZES, lambda table: [table, table]
+        else:
+            raise CommandError(f'Table sizes are not supported on {connection.vendor}')
+
+        grand_total = 0
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(query, params(table))
+                sizes = dict(cursor.fetchall())
+                if table not in sizes:
+                    raise CommandError(f'Unknown table {table}')
+                table_size = sizes.pop(table)
+                total = table_size + sum(sizes.values())
+                grand_total += total
+                self.stdout.write(f'{table:<58} {table_size:>14,} bytes  (with indexes {total:,})')
+                for index, size in sorted(sizes.items()):
+                    self.stdout.write(f'  {index:<56} {size:>14,} bytes')
+        self.stdout.write(f"{'total':<58} {grand_total:>14,} bytes")
@@ -0,0 +1,66 @@
+import atexit
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+# With PROMETHEUS_MULTIPROC_DIR set (one directory shared by all uvicorn
+# workers, emptied before they start), each process writes its samples to
+# memory-mapped files without cross-process locking and /metrics sums them.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter(
+    'portal_requests_total', 'HTTP requests served, by URL name, method and status.',
+    ['view', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'portal_request_duration_seconds', 'Time to produce a response, by URL name and status.',
+    ['view', 'status'], buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter(
+    'portal_db_queries_total', 'SQL queries run while serving requests, by URL name.', ['view'],
+)
+DB_SECONDS = Counter(
+    'portal_db_query_seconds_total', 'Time spent in SQL while serving requests, by URL name.', ['view'],
+)
+IN_FLIGHT = Gauge(
+    'portal_requests_in_flight', 'Requests currently being served.', multiprocess_mode='livesum',
+)
+LOGIN_FAILURES = Counter('portal_login_failures_total', 'Failed teacher logins.')
+
+class StudentCollector:
+    """Reports the student row count at scrape time from the subject summaries."""
+    def describe(self):
+        # Lets the registry check names without querying the database
+        yield GaugeMetricFamily('portal_students', 'Student rows in the database.')
+
+    def collect(self):
+        from django.db.models import Sum
+        from .models import SubjectSummary
+        total = SubjectSummary.objects.aggregate(total=Sum('count'))['total'] or 0
+        yield GaugeMetricFamily('portal_students', 'Student rows in the database.', value=total)
+
+def view_label(request):
+    """Returns the metrics label of a request: its portal URL name, 'other' or 'unresolved'."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    # Only portal routes get their own series, keeping label cardinality bounded
+    return match.view_name if match.view_name.startswith('portal:') else 'other'
+
+def scrape_registry():
+    """Returns the registry to expose: every worker's samples plus the app gauges."""
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(StudentCollector())
+    return registry
+
+if not MULTIPROCESS:
+    REGISTRY.register(StudentCollector())
+else:
+    # Drop this worker's live gauges (in-flight requests) when it exits
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
@@ -0,0 +1,149 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+from .timing import current_timings, start_timings, stop_timings
+
+logger = logging.getLogger('portal.timing')
+
+
+class RequestTimingMiddleware:
+    """
+    Reports SQL count and time, view time and JSON serialization time per request.
+
+    Enabled by the REQUEST_TIMING setting. When it is off the middleware
+    removes itself at startup, and the SQL timer installed on every
+    connection costs one context variable read per query. Timings are
+    sent in a Server-Timing header and logged to the portal.timing logger,
+    tagged with the resolved URL name. Place it near the top of MIDDLEWARE
+    so session and user loading are included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = start_timings()
+        request._timings = timings
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timings(token)
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = start_timings()
+        request._timings = timings
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timings(token)
+        return self.report(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timings.view_started = time.perf_counter()
+
+    def report(self, request, response, timings):
+        """Adds the Server-Timing header and logs the timings of a finished request."""
+        total = timings.total()
+        if timings.view_started is not None:
+            timings.view = time.perf_counter() - timings.view_started
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+            f'view;dur={timings.view * 1000:.2f}',
+            f'serialize;dur={timings.serialize * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        match = request.resolver_match
+        fields = {
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'db_ms': round(timings.db * 1000, 2),
+            'view_ms': round(timings.view * 1000, 2),
+            'serialize_ms': round(timings.serialize * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Feeds the Prometheus request, latency, in-flight and SQL metrics in portal.metrics.
+
+    Enabled by the METRICS setting. SQL is counted through the same
+    per-request timings as RequestTimingMiddleware, started here when that
+    middleware is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = self.start()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self.finish(request, status, timings, token)
+
+    async def __acall__(self, request):
+        timings, token = self.start()
+        status = 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self.finish(request, status, timings, token)
+
+    def start(self):
+        """Counts the request as in flight and returns (timings, reset token or None)."""
+        metrics.IN_FLIGHT.inc()
+        timings = current_timings()
+        if timings is not None:
+            return timings, None
+        return start_timings()
+
+    def finish(self, request, status, timings, token):
+        """Records a finished request."""
+        if token is not None:
+            stop_timings(token)
+        metrics.IN_FLIGHT.dec()
+        view = metrics.view_label(request)
+        status = str(status)
+        metrics.REQUESTS.labels(view, request.method, status).inc()
+        metrics.LATENCY.labels(view, status).observe(timings.total())
+        if timings.queries:
+            metrics.DB_QUERIES.labels(view).inc(timings.queries)
+            metrics.DB_SECONDS.labels(view).inc(timings.db)
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:54
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Sum
+
+
+def build_summaries(apps, schema_editor):
+    """Populate subject summaries from the existing students."""
+    Student = apps.get_model('portal', 'Student')
+    SubjectSummary = apps.get_model('portal', 'SubjectSummary')
+    rows = Student.objects.values('subject').annotate(
+        count=Count('id'),
+        total=Sum('marks'),
+        total_squares=Sum(F('marks') * F('marks')),
+        min_marks=Min('marks'),
+        max_marks=Max('marks'),
+    ).order_by()
+    SubjectSummary.objects.bulk_create([SubjectSummary(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0003_tableversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('total_squares', models.BigIntegerField(default=0)),
+                ('min_marks', models.IntegerField(blank=True, null=True)),
+                ('max_marks', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'subject summaries',
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
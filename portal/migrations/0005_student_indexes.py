@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0004_subjectsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['subject', 'marks'], name='student_subject_marks_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name'], name='student_name_idx'),
+        ),
+    ]
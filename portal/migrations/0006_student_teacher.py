@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0005_student_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='students', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='subjectsummary',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subject_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='subjectsummary',
+            name='subject',
+            field=models.CharField(max_length=100),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:14
+
+from django.contrib.auth.hashers import make_password
+from django.db import migrations
+from django.db.models import Count, F, Max, Min, Sum
+
+
+def assign_students(apps, schema_editor):
+    """Give existing students an owner and rebuild the summaries per teacher.
+
+    Students are assigned to the first superuser, else the first teacher. If
+    there are students but no teachers, an inactive 'unassigned' teacher with
+    an unusable password is created to own them.
+    """
+    Teacher = apps.get_model('portal', 'Teacher')
+    Student = apps.get_model('portal', 'Student')
+    SubjectSummary = apps.get_model('portal', 'SubjectSummary')
+
+    orphans = Student.objects.filter(teacher__isnull=True)
+    if orphans.exists():
+        owner = (
+            Teacher.objects.filter(is_superuser=True).order_by('id').first()
+            or Teacher.objects.order_by('id').first()
+        )
+        if owner is None:
+            owner = Teacher.objects.create(
+                username='unassigned', password=make_password(None), is_active=False,
+            )
+        orphans.update(teacher=owner)
+
+    SubjectSummary.objects.all().delete()
+    rows = Student.objects.values('teacher', 'subject').annotate(
+        count=Count('id'),
+        total=Sum('marks'),
+        total_squares=Sum(F('marks') * F('marks')),
+        min_marks=Min('marks'),
+        max_marks=Max('marks'),
+    ).order_by()
+    SubjectSummary.objects.bulk_create([
+        SubjectSummary(teacher_id=row.pop('teacher'), **row) for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0006_student_teacher'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_students, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0007_assign_student_teachers'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_subject_marks_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_name_idx',
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='students', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='subjectsummary',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subject_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='student',
+            unique_together={('teacher', 'name', 'subject')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectsummary',
+            unique_together={('teacher', 'subject')},
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['teacher', 'id'], name='student_teacher_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['teacher', 'subject', 'marks'], name='student_teacher_subject_idx'),
+        ),
+    ]
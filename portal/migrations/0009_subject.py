@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0008_student_teacher_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Subject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='student',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectsummary',
+            unique_together=set(),
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_teacher_subject_idx',
+        ),
+        migrations.RenameField(
+            model_name='student',
+            old_name='subject',
+            new_name='subject_name',
+        ),
+        migrations.RenameField(
+            model_name='subjectsummary',
+            old_name='subject',
+            new_name='subject_name',
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='subject',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='students', to='portal.subject'),
+        ),
+        migrations.AddField(
+            model_name='subjectsummary',
+            name='subject',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='portal.subject'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:04
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def link_subjects(apps, schema_editor):
+    """Create a Subject per distinct name and point students and summaries at it."""
+    Subject = apps.get_model('portal', 'Subject')
+    Student = apps.get_model('portal', 'Student')
+    SubjectSummary = apps.get_model('portal', 'SubjectSummary')
+    names = set(Student.objects.values_list('subject_name', flat=True).distinct())
+    names.update(SubjectSummary.objects.values_list('subject_name', flat=True))
+    Subject.objects.bulk_create([Subject(name=name) for name in sorted(names)], batch_size=500)
+    subject_id = Subquery(Subject.objects.filter(name=OuterRef('subject_name')).values('id')[:1])
+    Student.objects.update(subject=subject_id)
+    SubjectSummary.objects.update(subject=subject_id)
+
+
+def unlink_subjects(apps, schema_editor):
+    """Copy subject names back onto students and summaries."""
+    Subject = apps.get_model('portal', 'Subject')
+    Student = apps.get_model('portal', 'Student')
+    SubjectSummary = apps.get_model('portal', 'SubjectSummary')
+    subject_name = Subquery(Subject.objects.filter(id=OuterRef('subject')).values('name')[:1])
+    Student.objects.update(subject_name=subject_name)
+    SubjectSummary.objects.update(subject_name=subject_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0009_subject'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_subjects, unlink_subjects),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0010_populate_subjects'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='student',
+            name='subject_name',
+        ),
+        migrations.RemoveField(
+            model_name='subjectsummary',
+            name='subject_name',
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='students', to='portal.subject'),
+        ),
+        migrations.AlterField(
+            model_name='subjectsummary',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='portal.subject'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='student',
+            unique_together={('teacher', 'name', 'subject')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectsummary',
+            unique_together={('teacher', 'subject')},
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['teacher', 'subject', 'marks'], name='student_teacher_subject_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0011_student_subject_fk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarkEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marks', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('applied', models.BooleanField(default=True)),
+                ('student', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='mark_entries', to='portal.student')),
+            ],
+            options={
+                'verbose_name_plural': 'mark entries',
+                'indexes': [models.Index(fields=['student', 'created_at'], name='markentry_student_time_idx'), models.Index(condition=models.Q(('applied', False)), fields=['id'], name='markentry_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:05
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    """Record each student's current total as an applied opening entry."""
+    Student = apps.get_model('portal', 'Student')
+    MarkEntry = apps.get_model('portal', 'MarkEntry')
+    # Earlier history was never recorded, so totals can be reconstructed from now on
+    opened_at = timezone.now()
+    students = Student.objects.order_by('id').values_list('id', 'marks')
+    batch = []
+    for student_id, marks in students.iterator(chunk_size=2000):
+        batch.append(MarkEntry(student_id=student_id, marks=marks, created_at=opened_at, applied=True))
+        if len(batch) == 2000:
+            MarkEntry.objects.bulk_create(batch)
+            batch = []
+    MarkEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0012_markentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
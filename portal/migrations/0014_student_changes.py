@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0013_opening_mark_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['teacher', 'updated_at'], name='student_teacher_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='studenttombstone',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='student_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='studenttombstone',
+            index=models.Index(fields=['teacher', 'deleted_at'], name='tombstone_teacher_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studenttombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0014_student_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
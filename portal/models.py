@@ -1,5 +1,15 @@
-from django.db import models
+import math
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
+from .cache import forget_subject_names, is_shared_cache
+from .events import publish_on_commit
+from .hashers import run_hashing
 
 class TeacherManager(BaseUserManager):
     """
@@ -73,20 +83,1194 @@ class Teacher(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
 
+    def set_password(self, raw_password):
+        """
+        Hash and set the password, running the hasher in the bounded pool.
+
+        Args:
+            raw_password (str): The plain-text password.
+        """
+        self.password = run_hashing(make_password, raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Check a password in the bounded pool, upgrading an outdated hash.
+
+        The stored hash is re-encoded with the preferred hasher when it uses
+        another algorithm or weaker parameters than PASSWORD_HASHERS asks for.
+
+        Args:
+            raw_password (str): The plain-text password.
+
+        Returns:
+            bool: True if the password is correct.
+        """
+        must_update = []
+        is_correct = run_hashing(check_password, raw_password, self.password, must_update.append)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return is_correct
+
+class TableVersionManager(models.Manager):
+    """
+    Custom manager for the TableVersion model.
+
+    Provides cheap reads and atomic bumps of per-table change counters.
+    """
+    def get_version(self, name):
+        """
+        Return the current version of a table.
+
+        Args:
+            name (str): The name of the tracked table.
+
+        Returns:
+            tuple: (version, updated_at); (0, None) if it has never changed.
+        """
+        row = self.filter(name=name).values_list('version', 'updated_at').first()
+        return row or (0, None)
+
+    async def aget_version(self, name):
+        """
+        Return the current version of a table without blocking the event loop.
+
+        Args:
+            name (str): The name of the tracked table.
+
+        Returns:
+            tuple: (version, updated_at); (0, None) if it has never changed.
+        """
+        row = await self.filter(name=name).values_list('version', 'updated_at').afirst()
+        return row or (0, None)
+
+    def version_cache(self):
+        """
+        Return the cache holding table versions, if every worker shares it.
+
+        A bump only refreshes the cache of the process that made it, so an
+        in-process cache would let other workers serve a stale version (and
+        stale list pages keyed by it) until the entry expires.
+
+        Returns:
+            BaseCache: The TABLE_VERSION_CACHE backend, or None when it is local to this process.
+        """
+        if not is_shared_cache(settings.TABLE_VERSION_CACHE):
+            return None
+        return caches[settings.TABLE_VERSION_CACHE]
+
+    def cached_version(self, name):
+        """
+        Return the current version of a table, read through the version cache.
+
+        Reads straight from the database when the version cache is not shared.
+
+        Args:
+            name (str): The name of the tracked table.
+
+        Returns:
+            tuple: (version, updated_at); (0, None) if it has never changed.
+        """
+        cache = self.version_cache()
+        if cache is None:
+            return self.get_version(name)
+        key = self.cache_key(name)
+        version = cache.get(key)
+        if version is None:
+            version = self.get_version(name)
+            # add() so a concurrent bump's fresher value is never overwritten
+            cache.add(key, version, settings.TABLE_VERSION_CACHE_TIMEOUT)
+        return version
+
+    async def acached_version(self, name):
+        """
+        Return the current version of a table, read through the version cache.
+
+        Reads straight from the database when the version cache is not shared.
+
+        Args:
+            name (str): The name of the tracked table.
+
+        Returns:
+            tuple: (version, updated_at); (0, None) if it has never changed.
+        """
+        cache = self.version_cache()
+        if cache is None:
+            return await self.aget_version(name)
+        key = self.cache_key(name)
+        version = await cache.aget(key)
+        if version is None:
+            version = await self.aget_version(name)
+            await cache.aadd(key, version, settings.TABLE_VERSION_CACHE_TIMEOUT)
+        return version
+
+    def cache_key(self, name):
+        """
+        Return the cache key holding the version of a table.
+
+        Args:
+            name (str): The name of the tracked table.
+
+        Returns:
+            str: The cache key.
+        """
+        return f'table-version:{name}'
+
+    def bump(self, name):
+        """
+        Atomically increment the version of a table and publish it to the shared cache.
+
+        Args:
+            name (str): The name of the tracked table.
+        """
+        now = timezone.now()
+        if not self.filter(name=name).update(version=F('version') + 1, updated_at=now):
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(name=name, version=1, updated_at=now)
+            except IntegrityError:
+                self.filter(name=name).update(version=F('version') + 1, updated_at=now)
+        cache = self.version_cache()
+        if cache is not None:
+            cache.set(self.cache_key(name), self.get_version(name), settings.TABLE_VERSION_CACHE_TIMEOUT)
+
+    def bump_on_commit(self, name):
+        """
+        Bump the version of a table once the current transaction commits.
+
+        Bumping after commit guarantees a reader never pairs a new version
+        with data that is not yet visible to it.
+
+        Args:
+            name (str): The name of the tracked table.
+        """
+        transaction.on_commit(lambda: self.bump(name), using=self.db)
+
+class TableVersion(models.Model):
+    """
+    Model holding a change counter for a table, used for HTTP validators.
+    """
+    STUDENT = 'student'
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TableVersionManager()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def student_table(cls, teacher_id):
+        """
+        Return the tracked table name of one teacher's students.
+
+        Args:
+            teacher_id (int): The id of the teacher owning the students.
+
+        Returns:
+            str: The name to pass to the TableVersion manager.
+        """
+        return f'{cls.STUDENT}:{teacher_id}'
+
+class SubjectManager(models.Manager):
+    """
+    Custom manager for the Subject model.
+
+    Resolves subject names to ids, creating subjects on first use.
+    """
+    def ids_for(self, names):
+        """
+        Return the ids of the named subjects, creating any that are missing.
+
+        Args:
+            names (iterable): Subject names.
+
+        Returns:
+            dict: Subject id by name.
+        """
+        names = set(names)
+        ids = dict(self.filter(name__in=names).values_list('name', 'id'))
+        missing = names - ids.keys()
+        if missing:
+            # ignore_conflicts so a concurrent insert of the same name is not an error
+            self.bulk_create([self.model(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(self.filter(name__in=missing).values_list('name', 'id'))
+            transaction.on_commit(forget_subject_names, using=self.db)
+        return ids
+
+    def id_for(self, name):
+        """
+        Return the id of a subject, creating it if it is missing.
+
+        Args:
+            name (str): The subject name.
+
+        Returns:
+            int: The subject's id.
+        """
+        return self.ids_for([name])[name]
+
+class Subject(models.Model):
+    """
+    Model holding each distinct subject name once, referenced by id.
+    """
+    name = models.CharField(max_length=100, unique=True)
+
+    objects = SubjectManager()
+
+    def __str__(self):
+        return self.name
+
+class StudentVersionConflict(Exception):
+    """Raised when a student is updated with a version other than its current one."""
+    def __init__(self, current):
+        super().__init__(f'Student is at version {current}')
+        self.current = current
+
+class StudentManager(models.Manager):
+    """
+    Custom manager for the Student model.
+
+    Provides set-based write helpers for entering marks in bulk. Every change
+    to a student's marks is also appended to the MarkEntry ledger, and each
+    write is published to event stream subscribers once it commits.
+    """
+    LOOKUP_BATCH_SIZE = 500
+
+    def defers_totals(self):
+        """
+        Return True if added marks are left in the ledger for compaction.
+
+        Requires DEFERRED_MARK_TOTALS and a backend with RETURNING and ON
+        CONFLICT support (PostgreSQL, SQLite); otherwise totals are always
+        updated in place.
+
+        Returns:
+            bool: True if existing students' totals are deferred.
+        """
+        features = connections[self.db].features
+        return (settings.DEFERRED_MARK_TOTALS
+                and features.can_return_rows_from_bulk_insert
+                and features.supports_update_conflicts_with_target)
+
+    def add_marks(self, teacher, name, subject, marks):
+        """
+        Atomically add marks to a teacher's student, creating the row if needed.
+
+        On backends with RETURNING and ON CONFLICT support (PostgreSQL, SQLite)
+        the student row is written by an UPDATE ... SET marks = marks + n, or for
+        a new pair an INSERT ... ON CONFLICT DO NOTHING, so concurrent
+        submissions for the same (name, subject) neither lose updates nor raise
+        IntegrityError. The subject summary is updated in the same transaction.
+
+        When totals are deferred (see defers_totals) marks for an existing
+        student are only appended to the ledger, so concurrent entries never
+        wait on the student row; compact_marks folds them into the total.
+
+        Args:
+            teacher (Teacher): The teacher owning the student.
+            name (str): The student's name.
+            subject (str): The subject the marks are for.
+            marks (int): Marks to add to the student's total.
+
+        Returns:
+            tuple: (created, total) where total is the student's new marks, or
+                None if the marks were deferred.
+        """
+        connection = connections[self.db]
+        # Resolved before the transaction so its first statement is a write; on
+        # SQLite a read first would take a lock that concurrent writers cannot upgrade
+        subject_id = Subject.objects.id_for(subject)
+        with transaction.atomic(using=self.db):
+            if self.defers_totals():
+                created, student_id = self._insert_or_find(connection, teacher.pk, name, subject_id, marks)
+                MarkEntry.objects.create(student_id=student_id, marks=marks, applied=created)
+                if not created:
+                    return False, None
+                total = marks
+            elif (connection.features.can_return_columns_from_insert
+                    and connection.features.supports_update_conflicts_with_target):
+                created, student_id, total = self._upsert_marks(connection, teacher.pk, name, subject_id, marks)
+                MarkEntry.objects.create(student_id=student_id, marks=marks)
+            else:
+                created, student_id, total = self._fallback_add_marks(teacher, name, subject_id, marks)
+                MarkEntry.objects.create(student_id=student_id, marks=marks)
+            SubjectSummary.objects.apply_changes(teacher, [(subject_id, None if created else total - marks, total)])
+            TableVersion.objects.bump_on_commit(TableVersion.student_table(teacher.pk))
+            publish_on_commit(teacher.pk, 'add' if created else 'update', {
+                'id': student_id, 'name': name, 'subject': subject, 'marks': total,
+            }, using=self.db)
+        return created, total
+
+    def _insert_or_find(self, connection, teacher_id, name, subject_id, marks):
+        """Insert a student with the given marks, or return (False, id) of the existing one."""
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        teacher_col, name_col, subject_col, marks_col = qn('teacher_id'), qn('name'), qn('subject_id'), qn('marks')
+        updated_col, version_col = qn('updated_at'), qn('version')
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            while True:
+                # Writes first, so SQLite takes the write lock before any read
+                cursor.execute(
+                    f'INSERT INTO {table} ({teacher_col}, {name_col}, {subject_col}, {marks_col}, {updated_col}, {version_col}) '
+                    f'VALUES (%s, %s, %s, %s, %s, 1) '
+                    f"ON CONFLICT ({teacher_col}, {name_col}, {subject_col}) DO NOTHING RETURNING {qn('id')}",
+                    [teacher_id, name, subject_id, marks, updated_at],
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    return True, row[0]
+                student_id = self.filter(
+                    teacher_id=teacher_id, name=name, subject_id=subject_id,
+                ).values_list('id', flat=True).first()
+                # None if the student was deleted in between; insert it again
+                if student_id is not None:
+                    return False, student_id
+
+    def _upsert_marks(self, connection, teacher_id, name, subject_id, marks):
+        """Increment or insert a student row with single RETURNING statements."""
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        teacher_col, name_col, subject_col, marks_col = qn('teacher_id'), qn('name'), qn('subject_id'), qn('marks')
+        updated_col, version_col = qn('updated_at'), qn('version')
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f'UPDATE {table} SET {marks_col} = {marks_col} + %s, {updated_col} = %s, '
+                    f'{version_col} = {version_col} + 1 '
+                    f'WHERE {teacher_col} = %s AND {name_col} = %s AND {subject_col} = %s '
+                    f"RETURNING {qn('id')}, {marks_col}",
+                    [marks, updated_at, teacher_id, name, subject_id],
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    return False, row[0], row[1]
+                # A concurrent insert of the same pair makes this a no-op; retry the update
+                cursor.execute(
+                    f'INSERT INTO {table} ({teacher_col}, {name_col}, {subject_col}, {marks_col}, {updated_col}, {version_col}) '
+                    f'VALUES (%s, %s, %s, %s, %s, 1) '
+                    f'ON CONFLICT ({teacher_col}, {name_col}, {subject_col}) DO NOTHING '
+                    f"RETURNING {qn('id')}, {marks_col}",
+                    [teacher_id, name, subject_id, marks, updated_at],
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    return True, row[0], row[1]
+
+    def _fallback_add_marks(self, teacher, name, subject_id, marks):
+        """Increment in the database, creating the row if none matched."""
+        students = self.filter(teacher=teacher, name=name, subject_id=subject_id)
+        if not students.update(marks=F('marks') + marks, updated_at=timezone.now(), version=F('version') + 1):
+            try:
+                with transaction.atomic(using=self.db):
+                    student = self.create(teacher=teacher, name=name, subject_id=subject_id, marks=marks)
+                return True, student.pk, marks
+            except IntegrityError:
+                students.update(marks=F('marks') + marks, updated_at=timezone.now(), version=F('version') + 1)
+        return (False, *students.values_list('id', 'marks').get())
+
+    def bulk_add_marks(self, teacher, entries):
+        """
+        Add marks for many of a teacher's (name, subject) pairs in a single transaction.
+
+        Mirrors AddStudentView: marks are added to an existing student's total,
+        otherwise a new student is created. Repeated pairs within the batch are
+        summed before touching the database. Where RETURNING and ON CONFLICT are
+        supported each chunk is written by one multi-row upsert that increments
+        in SQL and reports each row's new total and version, so the summaries
+        are built from what was written rather than from an earlier read.
+        One ledger entry is appended per pair; when totals are deferred that
+        is the only write for existing students.
+
+        Args:
+            teacher (Teacher): The teacher owning the students.
+            entries (list): Dicts with validated 'name', 'subject' and 'marks'.
+
+        Returns:
+            list: 'created' or 'updated' for each entry, in input order.
+        """
+        totals = {}
+        statuses = []
+        for entry in entries:
+            key = (entry['name'], entry['subject'])
+            statuses.append('updated' if key in totals else 'created')
+            totals[key] = totals.get(key, 0) + entry['marks']
+        # Resolved before the transaction so its first statement is a write, as in add_marks
+        subject_ids = Subject.objects.ids_for(subject for _, subject in totals)
+        keyed = {(name, subject_ids[subject]): marks for (name, subject), marks in totals.items()}
+
+        if self.defers_totals():
+            return self._defer_bulk_marks(teacher, entries, keyed, subject_ids, statuses)
+
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            if (connection.features.can_return_rows_from_bulk_insert
+                    and connection.features.supports_update_conflicts_with_target):
+                written = self._bulk_upsert_marks(connection, teacher.pk, keyed)
+            else:
+                written = self._fallback_bulk_add_marks(teacher, keyed)
+            updated = {key for key, (_, _, created) in written.items() if not created}
+            MarkEntry.objects.append([
+                (student_id, keyed[key], True) for key, (student_id, _, _) in written.items()
+            ])
+            SubjectSummary.objects.apply_changes(teacher, [
+                (subject_id, None if created else marks - keyed[name, subject_id], marks)
+                for (name, subject_id), (_, marks, created) in written.items()
+            ])
+            TableVersion.objects.bump_on_commit(TableVersion.student_table(teacher.pk))
+            publish_on_commit(teacher.pk, 'batch', {
+                'created': len(written) - len(updated), 'updated': len(updated), 'deleted': 0,
+            }, using=self.db)
+
+        return [
+            'updated' if (entry['name'], subject_ids[entry['subject']]) in updated else status
+            for entry, status in zip(entries, statuses)
+        ]
+
+    def _fallback_bulk_add_marks(self, teacher, totals):
+        """bulk_add_marks without ON CONFLICT: lock existing students, then update and create."""
+        existing = {}
+        keys = list(totals)
+        for start in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+            chunk = keys[start:start + self.LOOKUP_BATCH_SIZE]
+            candidates = self.select_for_update().filter(
+                teacher=teacher,
+                name__in={name for name, _ in chunk},
+                subject_id__in={subject_id for _, subject_id in chunk},
+            )
+            for student in candidates:
+                key = (student.name, student.subject_id)
+                if key in totals:
+                    existing[key] = student
+        now = timezone.now()
+        for key, student in existing.items():
+            student.marks += totals[key]
+            student.updated_at = now
+            student.version = F('version') + 1
+        new_students = [
+            self.model(teacher=teacher, name=name, subject_id=subject_id, marks=marks)
+            for (name, subject_id), marks in totals.items() if (name, subject_id) not in existing
+        ]
+        self.bulk_update(existing.values(), ['marks', 'updated_at', 'version'], batch_size=self.LOOKUP_BATCH_SIZE)
+        self.bulk_create(new_students, batch_size=self.LOOKUP_BATCH_SIZE)
+        written = {key: (student.pk, student.marks, False) for key, student in existing.items()}
+        created = self._student_ids(teacher, [(student.name, student.subject_id) for student in new_students])
+        written.update((key, (student_id, totals[key], True)) for key, student_id in created.items())
+        return written
+
+    def _defer_bulk_marks(self, teacher, entries, totals, subject_ids, statuses):
+        """bulk_add_marks for deferred totals: insert new students, ledger the rest."""
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            created = self._bulk_insert_missing(connection, teacher.pk, totals)
+            student_ids = {key: student_id for key, student_id in created.items()}
+            student_ids.update(self._student_ids(teacher, [key for key in totals if key not in created]))
+            MarkEntry.objects.append([
+                (student_ids[key], marks, key in created) for key, marks in totals.items()
+            ])
+            if created:
+                SubjectSummary.objects.apply_changes(teacher, [
+                    (subject_id, None, totals[name, subject_id]) for name, subject_id in created
+                ])
+                TableVersion.objects.bump_on_commit(TableVersion.student_table(teacher.pk))
+                publish_on_commit(teacher.pk, 'batch', {
+                    'created': len(created), 'updated': 0, 'deleted': 0,
+                }, using=self.db)
+        return [
+            status if (entry['name'], subject_ids[entry['subject']]) in created else 'updated'
+            for entry, status in zip(entries, statuses)
+        ]
+
+    def _bulk_insert_missing(self, connection, teacher_id, totals):
+        """Insert the (name, subject id) pairs that have no student yet, returning their ids by pair."""
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        teacher_col, name_col, subject_col, marks_col = qn('teacher_id'), qn('name'), qn('subject_id'), qn('marks')
+        updated_col, version_col = qn('updated_at'), qn('version')
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        items = list(totals.items())
+        created = {}
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), self.LOOKUP_BATCH_SIZE):
+                chunk = items[start:start + self.LOOKUP_BATCH_SIZE]
+                values = ', '.join(['(%s, %s, %s, %s, %s, 1)'] * len(chunk))
+                cursor.execute(
+                    f'INSERT INTO {table} ({teacher_col}, {name_col}, {subject_col}, {marks_col}, {updated_col}, {version_col}) '
+                    f'VALUES {values} '
+                    f'ON CONFLICT ({teacher_col}, {name_col}, {subject_col}) DO NOTHING '
+                    f"RETURNING {qn('id')}, {name_col}, {subject_col}",
+                    [
+                        value for (name, subject_id), marks in chunk
+                        for value in (teacher_id, name, subject_id, marks, updated_at)
+                    ],
+                )
+                created.update(((name, subject_id), student_id) for student_id, name, subject_id in cursor.fetchall())
+        return created
+
+    def _student_ids(self, teacher, keys):
+        """Return the ids of a teacher's students by (name, subject id)."""
+        ids = {}
+        for start in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+            chunk = keys[start:start + self.LOOKUP_BATCH_SIZE]
+            rows = self.filter(
+                teacher=teacher,
+                name__in={name for name, _ in chunk},
+                subject_id__in={subject_id for _, subject_id in chunk},
+            ).values_list('name', 'subject_id', 'id')
+            ids.update(((name, subject_id), student_id) for name, subject_id, student_id in rows)
+        return ids
+
+    def totals_as_of(self, teacher, when):
+        """
+        Return a teacher's students annotated with their marks at a past time.
+
+        Totals are summed from the ledger, so they include deferred entries.
+        Students created after `when` are left out; deleted students, whose
+        entries are deleted with them, cannot be reconstructed. Names and
+        subjects are the current ones.
+
+        Args:
+            teacher (Teacher): The teacher owning the students.
+            when (datetime): The moment to reconstruct.
+
+        Returns:
+            QuerySet: Students with a `marks_as_of` annotation.
+        """
+        return self.filter(teacher=teacher, mark_entries__created_at__lte=when).annotate(
+            marks_as_of=Sum('mark_entries__marks'),
+        )
+
+    def update_student(self, teacher, pk, name=None, subject=None, marks=None, version=None):
+        """
+        Update a teacher's student and keep the subject summaries in step.
+
+        Only the fields given are written, by UPDATEs filtered on id and
+        teacher, without a SELECT or a full-row save. The first one sets the
+        name, bumps the row's version and returns the subject, marks and new
+        version the rest needs; when a version is given it is also part of
+        its WHERE clause, so a concurrent write is detected by the statement
+        itself rather than by a lock or an earlier read. Only when no row
+        matched is the row read, to tell a missing student from a conflict.
+        Pending ledger entries of the student are folded in when its subject
+        or marks change, and the difference to new marks is appended to the
+        ledger.
+
+        Args:
+            teacher (Teacher): The teacher owning the student.
+            pk (int): The student's id.
+            name (str): The new name, or None to keep it.
+            subject (str): The new subject name, or None to keep it.
+            marks (int): The new marks, or None to keep them.
+            version (int): The version the caller last read, or None to
+                update whatever the current version is.
+
+        Returns:
+            int: The student's new version, or None if the teacher has no
+            student with the given id.
+
+        Raises:
+            StudentVersionConflict: If the student's version is not the
+                given one.
+        """
+        # Resolved before the transaction so its first statement is a write, as in add_marks
+        subject_id = Subject.objects.id_for(subject) if subject is not None else None
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            old = self._touch_returning(teacher.pk, pk, now, name, version)
+            if old is not None:
+                old_subject_id, old_marks, new_version = old
+                if subject_id is not None or marks is not None:
+                    self._overwrite_marks(teacher, pk, old_subject_id, old_marks, subject_id, marks)
+                TableVersion.objects.bump_on_commit(TableVersion.student_table(teacher.pk))
+                changed = {'name': name, 'subject': subject, 'marks': marks}
+                publish_on_commit(teacher.pk, 'update', {
+                    'id': pk, 'version': new_version,
+                    **{field: value for field, value in changed.items() if value is not None},
+                }, using=self.db)
+                return new_version
+        current = self.filter(pk=pk, teacher=teacher).values_list('version', flat=True).first()
+        if current is None:
+            return None
+        raise StudentVersionConflict(current)
+
+    def _overwrite_marks(self, teacher, pk, old_subject_id, old_marks, subject_id, marks):
+        """Writes a locked student's new subject and/or marks, with its ledger entry and summaries."""
+        current = old_marks + MarkEntry.objects.apply_pending(pk)
+        if marks is None:
+            marks = current
+        elif marks != current:
+            MarkEntry.objects.create(student_id=pk, marks=marks - current)
+        if subject_id is None:
+            subject_id = old_subject_id
+        self.filter(pk=pk).update(subject_id=subject_id, marks=marks)
+        if old_subject_id == subject_id:
+            SubjectSummary.objects.apply_changes(teacher, [(old_subject_id, old_marks, marks)])
+        else:
+            SubjectSummary.objects.apply_changes(teacher, [
+                (old_subject_id, old_marks, None),
+                (subject_id, None, marks),
+            ])
+
+    def _touch_returning(self, teacher_id, pk, now, name=None, version=None):
+        """
+        Lock a teacher's student by setting updated_at, the name if given, and the next version.
+
+        Returns its (subject_id, marks, new version), or None if no student
+        with the id, teacher and, when given, version exists.
+        """
+        connection = connections[self.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            students = self.select_for_update().filter(pk=pk, teacher_id=teacher_id)
+            if version is not None:
+                students = students.filter(version=version)
+            old = students.values_list('subject_id', 'marks', 'version').first()
+            if old is None:
+                return None
+            changes = {'updated_at': now, 'version': F('version') + 1}
+            if name is not None:
+                changes['name'] = name
+            self.filter(pk=pk).update(**changes)
+            return old[0], old[1], old[2] + 1
+        # UPDATE ... RETURNING is available wherever multi-row INSERT ... RETURNING is
+        qn = connection.ops.quote_name
+        assignments = f"{qn('updated_at')} = %s, {qn('version')} = {qn('version')} + 1"
+        params = [connection.ops.adapt_datetimefield_value(now)]
+        if name is not None:
+            assignments += f", {qn('name')} = %s"
+            params.append(name)
+        condition = f"{qn('id')} = %s AND {qn('teacher_id')} = %s"
+        params += [pk, teacher_id]
+        if version is not None:
+            condition += f" AND {qn('version')} = %s"
+            params.append(version)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {qn(self.model._meta.db_table)} SET {assignments} WHERE {condition} "
+                f"RETURNING {qn('subject_id')}, {qn('marks')}, {qn('version')}",
+                params,
+            )
+            return cursor.fetchone()
+
+    def delete_student(self, teacher, pk):
+        """
+        Delete a teacher's student, remove it from its subject summary and
+        leave a tombstone for the change feed.
+
+        The row is removed by a single DELETE whose row count decides whether
+        the student existed; see delete_students.
+
+        Args:
+            teacher (Teacher): The teacher owning the student.
+            pk (int): The student's id.
+
+        Returns:
+            bool: False if the teacher has no student with the given id.
+        """
+        with transaction.atomic(using=self.db):
+            deleted = self._delete_returning(self.filter(pk=pk, teacher=teacher))
+            if not deleted:
+                return False
+            self._forget_deleted(teacher, deleted)
+            publish_on_commit(teacher.pk, 'delete', {'id': pk}, using=self.db)
+        return True
+
+    def delete_students(self, teacher, students):
+        """
+        Delete the teacher's students among a queryset with one DELETE statement.
+
+        The statement is DELETE ... WHERE id IN (<queryset>) RETURNING, so no
+        rows are loaded and no deletion collector runs; ledger entries are
+        removed by id, and summaries, tombstones and the list version are
+        updated from the returned rows.
+
+        Args:
+            teacher (Teacher): The teacher owning the students.
+            students (QuerySet): Students to delete; others' students are ignored.
+
+        Returns:
+            list: The ids of the deleted students, in ascending order.
+        """
+        with transaction.atomic(using=self.db):
+            deleted = self._delete_returning(students.filter(teacher=teacher))
+            if deleted:
+                self._forget_deleted(teacher, deleted)
+                publish_on_commit(teacher.pk, 'batch', {
+                    'created': 0, 'updated': 0, 'deleted': len(deleted),
+                }, using=self.db)
+        return sorted(student_id for student_id, _, _ in deleted)
+
+    def _delete_returning(self, students):
+        """Delete a queryset's rows, returning their (id, subject_id, marks)."""
+        connection = connections[self.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            rows = list(students.select_for_update().values_list('id', 'subject_id', 'marks'))
+            ids = [student_id for student_id, _, _ in rows]
+            for start in range(0, len(ids), self.LOOKUP_BATCH_SIZE):
+                self.filter(pk__in=ids[start:start + self.LOOKUP_BATCH_SIZE])._raw_delete(self.db)
+            return rows
+        # DELETE ... RETURNING is available wherever multi-row INSERT ... RETURNING is
+        qn = connection.ops.quote_name
+        subquery, params = students.order_by().values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {qn(self.model._meta.db_table)} WHERE {qn('id')} IN ({subquery}) "
+                f"RETURNING {qn('id')}, {qn('subject_id')}, {qn('marks')}",
+                params,
+            )
+            return cursor.fetchall()
+
+    def _forget_deleted(self, teacher, deleted):
+        """Remove the ledger entries and summary contributions of deleted (id, subject_id, marks) rows."""
+        ids = [student_id for student_id, _, _ in deleted]
+        for start in range(0, len(ids), self.LOOKUP_BATCH_SIZE):
+            MarkEntry.objects.filter(student_id__in=ids[start:start + self.LOOKUP_BATCH_SIZE])._raw_delete(self.db)
+        StudentTombstone.objects.bulk_create([
+            StudentTombstone(teacher=teacher, student_id=student_id) for student_id in ids
+        ])
+        SubjectSummary.objects.apply_changes(teacher, [
+            (subject_id, marks, None) for _, subject_id, marks in deleted
+        ])
+        TableVersion.objects.bump_on_commit(TableVersion.student_table(teacher.pk))
+
+    def _bulk_upsert_marks(self, connection, teacher_id, totals):
+        """
+        Add marks per (name, subject id) with one multi-row ON CONFLICT ... RETURNING statement per chunk.
+
+        Returns (id, new marks, created) by pair; inserted rows are the ones
+        RETURNING reports at version 1, since an update always increments it.
+        """
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        teacher_col, name_col, subject_col, marks_col = qn('teacher_id'), qn('name'), qn('subject_id'), qn('marks')
+        updated_col, version_col = qn('updated_at'), qn('version')
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        items = list(totals.items())
+        written = {}
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), self.LOOKUP_BATCH_SIZE):
+                chunk = items[start:start + self.LOOKUP_BATCH_SIZE]
+                values = ', '.join(['(%s, %s, %s, %s, %s, 1)'] * len(chunk))
+                cursor.execute(
+                    f'INSERT INTO {table} ({teacher_col}, {name_col}, {subject_col}, {marks_col}, {updated_col}, {version_col}) '
+                    f'VALUES {values} '
+                    f'ON CONFLICT ({teacher_col}, {name_col}, {subject_col}) '
+                    f'DO UPDATE SET {marks_col} = {table}.{marks_col} + excluded.{marks_col}, '
+                    f'{updated_col} = excluded.{updated_col}, {version_col} = {table}.{version_col} + 1 '
+                    f"RETURNING {qn('id')}, {name_col}, {subject_col}, {marks_col}, {version_col}",
+                    [
+                        value for (name, subject_id), marks in chunk
+                        for value in (teacher_id, name, subject_id, marks, updated_at)
+                    ],
+                )
+                written.update(
+                    ((name, subject_id), (student_id, marks, version == 1))
+                    for student_id, name, subject_id, marks, version in cursor.fetchall()
+                )
+        return written
+
 class Student(models.Model):
     """
-    Model representing a student with name, subject, and marks.
+    Model representing a teacher's student with name, subject, and marks.
     """
+    # Every index below leads with teacher, so the FKs need no index of their own
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='students', db_index=False)
     name = models.CharField(max_length=100)
-    subject = models.CharField(max_length=100)
+    subject = models.ForeignKey(Subject, on_delete=models.PROTECT, related_name='students', db_index=False)
     marks = models.IntegerField()
+    # Set by every write to the row, for the change feed; not auto_now, which
+    # the set-based writes in StudentManager would bypass
+    updated_at = models.DateTimeField(default=timezone.now)
+    # Incremented by every write to the row; updates may require the version
+    # they last read (optimistic concurrency), checked in the UPDATE itself
+    version = models.PositiveIntegerField(default=1)
+
+    objects = StudentManager()
     # If you want to add these fields:
     # email = models.EmailField(blank=True)
     # phone = models.CharField(max_length=15, blank=True)
-    # teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, null=True, blank=True)
 
     class Meta:
-        unique_together = ('name', 'subject')
+        # Also serves name filters and ordering within a teacher's students
+        unique_together = ('teacher', 'name', 'subject')
+        indexes = [
+            models.Index(fields=['teacher', 'id'], name='student_teacher_id_idx'),
+            models.Index(fields=['teacher', 'subject', 'marks'], name='student_teacher_subject_idx'),
+            models.Index(fields=['teacher', 'updated_at'], name='student_teacher_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+    def save(self, *args, **kwargs):
+        """
+        Save the student, stamping updated_at and the next version of an existing row.
+
+        Prefer StudentManager for writes; a plain save() keeps the change feed
+        and version checks working but bypasses the ledger and subject
+        summaries.
+        """
+        if not self._state.adding:
+            self.updated_at = timezone.now()
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'updated_at', 'version'}
+        super().save(*args, **kwargs)
+
+class MarkEntryManager(models.Manager):
+    """
+    Custom manager for the MarkEntry model.
+
+    Folds pending ledger entries into the materialized Student totals.
+    """
+    def append(self, entries):
+        """
+        Insert ledger entries with one multi-row INSERT per chunk.
+
+        bulk_create would split chunks further to stay under SQLite's legacy
+        999 parameter limit.
+
+        Args:
+            entries (list): (student_id, marks, applied) tuples.
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        columns = ', '.join(qn(column) for column in ('student_id', 'marks', 'created_at', 'applied'))
+        created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        batch_size = StudentManager.LOOKUP_BATCH_SIZE
+        with connection.cursor() as cursor:
+            for start in range(0, len(entries), batch_size):
+                chunk = entries[start:start + batch_size]
+                values = ', '.join(['(%s, %s, %s, %s)'] * len(chunk))
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}) VALUES {values}',
+                    [
+                        value for student_id, marks, applied in chunk
+                        for value in (student_id, marks, created_at, applied)
+                    ],
+                )
+
+    def apply_pending(self, student_id):
+        """
+        Mark a student's pending entries applied, for a caller rewriting its total.
+
+        Call inside a transaction holding the student row lock.
+
+        Args:
+            student_id (int): The student's id.
+
+        Returns:
+            int: The sum of the entries that were pending.
+        """
+        connection = connections[self.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            pending = list(self.filter(student_id=student_id, applied=False).values_list('id', 'marks'))
+            if pending:
+                self.filter(id__in=[entry_id for entry_id, _ in pending]).update(applied=True)
+            return sum(marks for _, marks in pending)
+        qn = connection.ops.quote_name
+        applied = qn('applied')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {qn(self.model._meta.db_table)} SET {applied} = %s "
+                f"WHERE {qn('student_id')} = %s AND {applied} = %s RETURNING {qn('marks')}",
+                [True, student_id, False],
+            )
+            return sum(marks for marks, in cursor.fetchall())
+
+    def compact(self, batch_size):
+        """
+        Fold up to batch_size pending entries into their students' totals.
+
+        Totals, subject summaries and table versions are updated in one
+        transaction, oldest entries first. The batch is read outside it, then
+        its students are locked before their entries are claimed by an UPDATE
+        guarded on applied, the same order update_student takes them in: an
+        entry another compaction or an overwrite applied in the meantime is
+        not claimed, and only the claimed entries are added.
+
+        Args:
+            batch_size (int): Maximum number of entries to fold.
+
+        Returns:
+            int: The number of entries folded; fewer than batch_size once the
+                ledger has been caught up.
+        """
+        pending = self._pending_batch(batch_size)
+        if not pending:
+            return 0
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            if connection.features.has_select_for_update:
+                list(Student.objects.select_for_update().filter(
+                    pk__in={student_id for _, student_id in pending},
+                ).order_by('pk').values_list('pk', flat=True))
+            claimed = self._claim([entry_id for entry_id, _ in pending])
+            if not claimed:
+                return 0
+            deltas = {}
+            for student_id, marks in claimed:
+                deltas[student_id] = deltas.get(student_id, 0) + marks
+
+            students = list(Student.objects.filter(pk__in=deltas).order_by('pk'))
+            changes = {}
+            now = timezone.now()
+            for student in students:
+                new_marks = student.marks + deltas[student.pk]
+                changes.setdefault(student.teacher_id, []).append((student.subject_id, student.marks, new_marks))
+                student.marks = new_marks
+                student.updated_at = now
+                student.version = F('version') + 1
+            Student.objects.bulk_update(
+                students, ['marks', 'updated_at', 'version'], batch_size=StudentManager.LOOKUP_BATCH_SIZE,
+            )
+
+            teachers = Teacher.objects.in_bulk(changes)
+            for teacher_id, teacher_changes in changes.items():
+                SubjectSummary.objects.apply_changes(teachers[teacher_id], teacher_changes)
+                TableVersion.objects.bump_on_commit(TableVersion.student_table(teacher_id))
+                publish_on_commit(teacher_id, 'batch', {
+                    'created': 0, 'updated': len(teacher_changes), 'deleted': 0,
+                }, using=self.db)
+        return len(claimed)
+
+    def _pending_batch(self, batch_size):
+        """Returns (id, student_id) of up to batch_size of the oldest pending entries."""
+        return list(self.filter(applied=False).order_by('id').values_list('id', 'student_id')[:batch_size])
+
+    def _claim(self, entry_ids):
+        """Marks the given entries applied unless they already are, returning the claimed (student_id, marks)."""
+        connection = connections[self.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            claimed = list(
+                self.select_for_update().filter(id__in=entry_ids, applied=False).values_list('id', 'student_id', 'marks')
+            )
+            self.filter(id__in=[entry_id for entry_id, _, _ in claimed]).update(applied=True)
+            return [(student_id, marks) for _, student_id, marks in claimed]
+        qn = connection.ops.quote_name
+        applied = qn('applied')
+        claimed = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(entry_ids), StudentManager.LOOKUP_BATCH_SIZE):
+                chunk = entry_ids[start:start + StudentManager.LOOKUP_BATCH_SIZE]
+                cursor.execute(
+                    f"UPDATE {qn(self.model._meta.db_table)} SET {applied} = %s "
+                    f"WHERE {qn('id')} IN ({', '.join(['%s'] * len(chunk))}) AND {applied} = %s "
+                    f"RETURNING {qn('student_id')}, {qn('marks')}",
+                    [True, *chunk, False],
+                )
+                claimed.extend(cursor.fetchall())
+        return claimed
+
+class MarkEntry(models.Model):
+    """
+    Model recording one change to a student's marks in an append-only ledger.
+
+    An entry is applied once Student.marks includes it. Entries are only
+    ever updated to mark them applied.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='mark_entries', db_index=False)
+    marks = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    applied = models.BooleanField(default=True)
+
+    objects = MarkEntryManager()
+
+    class Meta:
+        verbose_name_plural = 'mark entries'
+        indexes = [
+            models.Index(fields=['student', 'created_at'], name='markentry_student_time_idx'),
+            models.Index(fields=['id'], condition=Q(applied=False), name='markentry_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} {self.marks:+d}"
+
+class StudentTombstoneManager(models.Manager):
+    """
+    Custom manager for the StudentTombstone model.
+    """
+    def prune(self, before):
+        """
+        Delete tombstones older than a cutoff.
+
+        Args:
+            before (datetime): Tombstones of deletions before this are removed.
+
+        Returns:
+            int: The number of tombstones deleted.
+        """
+        deleted, _ = self.filter(deleted_at__lt=before).delete()
+        return deleted
+
+class StudentTombstone(models.Model):
+    """
+    Model recording the id of a deleted student, so the change feed can report it.
+    """
+    teacher = models.ForeignKey(
+        Teacher, on_delete=models.CASCADE, related_name='student_tombstones', db_index=False,
+    )
+    student_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    objects = StudentTombstoneManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', 'deleted_at'], name='tombstone_teacher_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+class SubjectSummaryManager(models.Manager):
+    """
+    Custom manager for the SubjectSummary model.
+
+    Folds individual student changes into running per-teacher, per-subject statistics.
+    """
+    def apply_changes(self, teacher, changes):
+        """
+        Apply a teacher's student mark changes to the affected subject summaries.
+
+        Count, sum and sum of squares are adjusted in place. Min and max only
+        widen incrementally; a bound is looked up again from Student when a
+        removed value sat on it.
+
+        Args:
+            teacher (Teacher): The teacher owning the changed students.
+            changes (iterable): (subject_id, old, new) tuples, where old is None
+                for an inserted student and new is None for a deleted one.
+        """
+        deltas = {}
+        for subject_id, old, new in changes:
+            if old == new:
+                continue
+            delta = deltas.setdefault(subject_id, {
+                'count': 0, 'total': 0, 'squares': 0, 'added': [], 'removed': [],
+            })
+            if old is not None:
+                delta['count'] -= 1
+                delta['total'] -= old
+                delta['squares'] -= old * old
+                delta['removed'].append(old)
+            if new is not None:
+                delta['count'] += 1
+                delta['total'] += new
+                delta['squares'] += new * new
+                delta['added'].append(new)
+
+        # Callers already hold a transaction, so skip the extra savepoint round trips
+        with transaction.atomic(using=self.db, savepoint=False):
+            for subject_id in sorted(deltas):
+                self._apply_delta(teacher, subject_id, deltas[subject_id])
+
+    def _apply_delta(self, teacher, subject_id, delta):
+        """Apply one subject's aggregated delta with a single UPDATE where possible."""
+        low = min(delta['added'], default=None)
+        high = max(delta['added'], default=None)
+        fields = {
+            'count': F('count') + delta['count'],
+            'total': F('total') + delta['total'],
+            'total_squares': F('total_squares') + delta['squares'],
+        }
+        if low is not None:
+            fields['min_marks'] = Least(Coalesce(F('min_marks'), Value(low)), Value(low))
+            fields['max_marks'] = Greatest(Coalesce(F('max_marks'), Value(high)), Value(high))
+
+        summaries = self.filter(teacher=teacher, subject_id=subject_id)
+        if not summaries.update(**fields):
+            if delta['removed']:
+                # The summary is missing although students existed; rebuild it
+                self.rebuild(teacher, subject_id)
+                return
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(
+                        teacher=teacher,
+                        subject_id=subject_id,
+                        count=delta['count'],
+                        total=delta['total'],
+                        total_squares=delta['squares'],
+                        min_marks=low,
+                        max_marks=high,
+                    )
+                return
+            except IntegrityError:
+                summaries.update(**fields)
+
+        if delta['removed']:
+            summary = summaries.values('count', 'min_marks', 'max_marks').get()
+            if summary['count'] <= 0:
+                summaries.delete()
+                return
+            bounds = {}
+            students = Student.objects.filter(teacher=teacher, subject_id=subject_id).values_list('marks', flat=True)
+            if min(delta['removed']) <= summary['min_marks']:
+                bounds['min_marks'] = students.order_by('marks').first()
+            if max(delta['removed']) >= summary['max_marks']:
+                bounds['max_marks'] = students.order_by('-marks').first()
+            if bounds:
+                summaries.update(**bounds)
+
+    def rebuild(self, teacher, subject_id):
+        """
+        Recompute a teacher's subject summary from the Student table.
+
+        Args:
+            teacher (Teacher): The teacher owning the students.
+            subject_id (int): The id of the subject to recompute.
+        """
+        stats = Student.objects.filter(teacher=teacher, subject_id=subject_id).aggregate(
+            count=Count('id'),
+            total=Sum('marks'),
+            total_squares=Sum(F('marks') * F('marks')),
+            min_marks=Min('marks'),
+            max_marks=Max('marks'),
+        )
+        if not stats['count']:
+            self.filter(teacher=teacher, subject_id=subject_id).delete()
+            return
+        self.update_or_create(teacher=teacher, subject_id=subject_id, defaults=stats)
+
+class SubjectSummary(models.Model):
+    """
+    Model holding running statistics of one teacher's Student marks for one subject.
+    """
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='subject_summaries', db_index=False)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='summaries', db_index=False)
+    count = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    total_squares = models.BigIntegerField(default=0)
+    min_marks = models.IntegerField(null=True, blank=True)
+    max_marks = models.IntegerField(null=True, blank=True)
+
+    objects = SubjectSummaryManager()
+
+    class Meta:
+        unique_together = ('teacher', 'subject')
+        verbose_name_plural = 'subject summaries'
+
+    def __str__(self):
+        return f"{self.subject} ({self.count})"
+
+    @property
+    def average(self):
+        """Mean marks for the subject."""
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        """Population standard deviation of marks for the subject."""
+        if not self.count:
+            return None
+        variance = self.total_squares / self.count - (self.total / self.count) ** 2
+        return math.sqrt(max(variance, 0))
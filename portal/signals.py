@@ -0,0 +1,39 @@
+from django.contrib.auth.signals import user_logged_out, user_login_failed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .backends import forget_teacher
+from .cache import forget_subject_names
+from .metrics import LOGIN_FAILURES
+from .models import Student, Subject, TableVersion, Teacher
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def bump_student_version(sender, instance, **kwargs):
+    """Marks the owning teacher's students as changed whenever a row is saved or deleted."""
+    TableVersion.objects.bump_on_commit(TableVersion.student_table(instance.teacher_id))
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def forget_subjects(sender, **kwargs):
+    """Drops the cached subject names once a subject change commits."""
+    transaction.on_commit(forget_subject_names)
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def forget_cached_teacher(sender, instance, **kwargs):
+    """Drops the cached request.user of a teacher that was saved or deleted."""
+    forget_teacher(instance.pk)
+    # Again after commit, in case a request re-cached the row before it committed
+    transaction.on_commit(lambda: forget_teacher(instance.pk))
+
+@receiver(user_logged_out)
+def forget_logged_out_teacher(sender, user, **kwargs):
+    """Drops the cached request.user of a teacher that logged out."""
+    if user is not None:
+        forget_teacher(user.pk)
+
+@receiver(user_login_failed)
+def count_login_failure(sender, **kwargs):
+    """Counts failed logins for the metrics endpoint."""
+    LOGIN_FAILURES.inc()
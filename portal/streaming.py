@@ -0,0 +1,80 @@
+import csv
+import io
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .codec import dumps
+
+
+class JSONStreamEncoder:
+    """Frames batches of student row tuples as a JSON array or as NDJSON bytes of objects."""
+    def __init__(self, fields, ndjson=False):
+        self.fields = fields
+        self.ndjson = ndjson
+        self.first = True
+
+    def open(self):
+        return b'' if self.ndjson else b'['
+
+    def encode(self, rows):
+        fields = self.fields
+        if self.ndjson:
+            return b''.join(dumps(dict(zip(fields, row))) + b'\n' for row in rows)
+        prefix = b'' if self.first else b','
+        self.first = False
+        return prefix + b','.join(dumps(dict(zip(fields, row))) for row in rows)
+
+    def close(self):
+        return b'' if self.ndjson else b']'
+
+
+class CSVStreamEncoder:
+    """Frames batches of student row tuples as CSV with a header line."""
+    def __init__(self, fields):
+        self.fields = fields
+        self.rows = 0
+
+    def _write(self, records):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(records)
+        return buffer.getvalue()
+
+    def open(self):
+        return self._write([self.fields])
+
+    def encode(self, rows):
+        self.rows += len(rows)
+        return self._write(rows)
+
+    def close(self):
+        return ''
+
+
+def stream_rows(rows, encoder, chunk_size=None):
+    """Yields a values_list() queryset as encoded text, one chunk of rows at a time."""
+    chunk_size = chunk_size or settings.STUDENT_STREAM_CHUNK_SIZE
+    batch = []
+    yield encoder.open()
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield encoder.encode(batch)
+            batch = []
+    if batch:
+        yield encoder.encode(batch)
+    yield encoder.close()
+
+
+async def astream_rows(rows, encoder, chunk_size=None):
+    """Async counterpart of stream_rows used when serving under ASGI."""
+    chunk_size = chunk_size or settings.STUDENT_STREAM_CHUNK_SIZE
+    # Django 4.2's values_list().aiterator() runs the query on the event loop,
+    # so fetch each chunk from the sync iterator in a worker thread instead
+    iterator = rows.iterator(chunk_size=chunk_size)
+    next_batch = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    yield encoder.open()
+    while batch := await next_batch():
+        yield encoder.encode(batch)
+    yield encoder.close()
@@ -0,0 +1,54 @@
+import time
+from contextvars import ContextVar
+
+# Timings of the request being served, or None when instrumentation is off.
+# Context variables follow the request into sync_to_async threads, so SQL run
+# by async views is attributed to the right request.
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Mutable per-request counters filled in by the SQL timer and the JSON codec."""
+    __slots__ = ('started', 'view_started', 'view', 'queries', 'db', 'serialize')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view = 0.0
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+
+    def total(self):
+        """Returns the seconds elapsed since the timings started."""
+        return time.perf_counter() - self.started
+
+def current_timings():
+    """Returns the timings of the current request, or None when not instrumented."""
+    return _current.get()
+
+def start_timings():
+    """Starts timing the current request, returning (timings, reset token)."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+def stop_timings(token):
+    """Stops timing the current request."""
+    _current.reset(token)
+
+def sql_timer(execute, sql, params, many, context):
+    """Execute wrapper counting queries and SQL time for the instrumented request."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - started
+
+def install_sql_timer(connection, **kwargs):
+    """Adds sql_timer to a connection's execute wrappers once."""
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
@@ -1,21 +1,53 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import (
-    RegisterView, LoginView, HomeView, StudentListView, 
-    AddStudentView, UpdateStudentView, DeleteStudentView, 
-    LogoutView, health_check, #debug_info
+    RegisterView, LoginView, HomeView, StudentListView, StudentChangesView,
+    AddStudentView, BatchAddStudentView, UpdateStudentView, DeleteStudentView, BulkDeleteStudentsView,
+    SubjectSummaryView, SubjectListView, StudentsAsOfView, StudentExportView, StudentListCacheStatsView, LogoutView, health_check, metrics_view, #debug_info
 )
 
 app_name = 'portal'
 
-urlpatterns = [
-    path('register/', RegisterView.as_view(), name='register'),
-    path('login/', LoginView.as_view(), name='login'),
-    path('home/', HomeView.as_view(), name='home'),
-    path('students/', StudentListView.as_view(), name='get_students'),
-    path('student/', AddStudentView.as_view(), name='add_student'),
-    path('student/<int:id>/', UpdateStudentView.as_view(), name='update_student'),
-    path('student/<int:id>/delete/', DeleteStudentView.as_view(), name='delete_student'),
-    path('logout/', LogoutView.as_view(), name='logout'),
-    path('health/', health_check, name='health_check'),
-    # path('debug/', debug_info, name='debug_info'),
-]
+def build_urlpatterns(async_views_enabled):
+    """Returns the portal routes, serving the hot student endpoints async if enabled."""
+    if async_views_enabled:
+        student_views = (
+            async_views.AsyncStudentListView, async_views.AsyncStudentChangesView, async_views.AsyncAddStudentView,
+            async_views.AsyncUpdateStudentView, async_views.AsyncDeleteStudentView,
+            async_views.health_check,
+        )
+    else:
+        student_views = (
+            StudentListView, StudentChangesView, AddStudentView, UpdateStudentView, DeleteStudentView, health_check,
+        )
+    list_view, changes_view, add_view, update_view, delete_view, health_view = student_views
+    urlpatterns = [
+        path('register/', RegisterView.as_view(), name='register'),
+        path('login/', LoginView.as_view(), name='login'),
+        path('home/', HomeView.as_view(), name='home'),
+        path('students/', list_view.as_view(), name='get_students'),
+        path('students/changes/', changes_view.as_view(), name='student_changes'),
+        path('student/', add_view.as_view(), name='add_student'),
+        path('students/export.csv', StudentExportView.as_view(), name='export_students'),
+        path('students/summary/', SubjectSummaryView.as_view(), name='student_summary'),
+        path('students/as-of/', StudentsAsOfView.as_view(), name='students_as_of'),
+        path('subjects/', SubjectListView.as_view(), name='subject_list'),
+        path('students/cache/', StudentListCacheStatsView.as_view(), name='student_cache_stats'),
+        path('students/batch/', BatchAddStudentView.as_view(), name='batch_add_students'),
+        path('students/delete/', BulkDeleteStudentsView.as_view(), name='bulk_delete_students'),
+        path('student/<int:id>/', update_view.as_view(), name='update_student'),
+        path('student/<int:id>/delete/', delete_view.as_view(), name='delete_student'),
+        path('logout/', LogoutView.as_view(), name='logout'),
+        path('health/', health_view, name='health_check'),
+        path('metrics', metrics_view, name='metrics'),
+        # path('debug/', debug_info, name='debug_info'),
+    ]
+    if async_views_enabled:
+        # Only served async: under WSGI a long-lived stream would hold a worker thread
+        urlpatterns.append(
+            path('students/events/', async_views.StudentEventsView.as_view(), name='student_events'),
+        )
+    return urlpatterns
+
+urlpatterns = build_urlpatterns(settings.ASYNC_VIEWS)
@@ -0,0 +1,104 @@
+import json
+import re
+
+from django.utils.http import parse_etags
+
+from . import codec
+
+# Names, subjects and credentials may only hold letters, digits and whitespace
+TEXT_PATTERN = re.compile(r'[a-zA-Z0-9\s]+')
+
+def parse_json_body(request):
+    """Decodes the request body, returning (data, error)."""
+    try:
+        return codec.loads(request.body), None
+    except json.JSONDecodeError:
+        return None, 'Invalid JSON'
+
+def validate_input(data):
+    """Validates input to contain only alphanumeric characters and spaces."""
+    fullmatch = TEXT_PATTERN.fullmatch
+    for value in data.values():
+        if isinstance(value, str) and fullmatch(value) is None:
+            return False
+    return True
+
+def clean_marks(marks):
+    """Coerces marks to an int in 0-100, returning (marks, error)."""
+    try:
+        marks = int(marks)
+    except (ValueError, TypeError):
+        return None, 'Invalid marks value'
+    if marks < 0 or marks > 100:
+        return None, 'Marks must be between 0 and 100'
+    return marks, None
+
+def clean_student_data(data):
+    """Validates a name/subject/marks payload in one pass, returning (cleaned, error)."""
+    if not isinstance(data, dict):
+        return None, 'Invalid input'
+    name = data.get('name')
+    subject = data.get('subject')
+    marks = data.get('marks')
+
+    # Check if all required fields are present
+    if not name or not subject or marks is None:
+        return None, 'Name, subject, and marks are required'
+
+    fullmatch = TEXT_PATTERN.fullmatch
+    if not isinstance(name, str) or not isinstance(subject, str) or fullmatch(name) is None or fullmatch(subject) is None:
+        return None, 'Invalid input'
+
+    marks, error = clean_marks(marks)
+    if error:
+        return None, error
+    return {'name': name, 'subject': subject, 'marks': marks}, None
+
+STUDENT_PATCH_FIELDS = ('name', 'subject', 'marks')
+
+def clean_student_patch(data):
+    """Validates the fields present in a partial student update, returning (cleaned, error)."""
+    if not isinstance(data, dict):
+        return None, 'Invalid input'
+    cleaned = {field: data[field] for field in STUDENT_PATCH_FIELDS if data.get(field) is not None}
+    if not cleaned:
+        return None, 'At least one of name, subject and marks is required'
+
+    fullmatch = TEXT_PATTERN.fullmatch
+    for field in ('name', 'subject'):
+        if field in cleaned and (not isinstance(cleaned[field], str) or fullmatch(cleaned[field]) is None):
+            return None, 'Invalid input'
+
+    if 'marks' in cleaned:
+        cleaned['marks'], error = clean_marks(cleaned['marks'])
+        if error:
+            return None, error
+    return cleaned, None
+
+def clean_version(request, data):
+    """
+    Returns the student version an update requires, as (version, error).
+
+    Taken from an If-Match header holding one ETag as sent by the update
+    views, or else from a "version" field of the body; the version is None
+    when neither is given or If-Match is "*".
+    """
+    header = request.headers.get('If-Match')
+    if header is not None:
+        etags = parse_etags(header)
+        if etags == ['*']:
+            return None, None
+        if len(etags) != 1:
+            return None, 'If-Match must hold one student version'
+        version = etags[0].removeprefix('W/').strip('"')
+    elif isinstance(data, dict) and data.get('version') is not None:
+        version = data['version']
+    else:
+        return None, None
+    try:
+        version = int(version)
+    except (ValueError, TypeError):
+        return None, 'Invalid version'
+    if version < 1:
+        return None, 'Invalid version'
+    return version, None
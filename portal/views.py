@@ -1,25 +1,31 @@
 from django.views import View
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth import authenticate, login, logout
-from .models import Teacher, Student
-from django.views.decorators.http import require_POST
+from .models import Teacher, Student, StudentTombstone, StudentVersionConflict, SubjectSummary, TableVersion
+from django.db.models import Q
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from . import codec
+from .cache import get_student_page, get_subject_names, student_list_stats
+from .codec import JsonResponse
+from .metrics import scrape_registry
+from .streaming import CSVStreamEncoder, JSONStreamEncoder, astream_rows, stream_rows
+from .validation import clean_student_data, clean_student_patch, clean_version, validate_input
+from django.views.decorators.http import require_POST, condition
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-import re
+from django.utils.http import quote_etag
+import datetime
 import json
 import os
+import re
 import sys
 import django
 from django.conf import settings
-
-def validate_input(data):
-    """Validates input to contain only alphanumeric characters and spaces."""
-    pattern = r'^[a-zA-Z0-9\s]+$'
-    for value in data.values():
-        if isinstance(value, str) and not re.match(pattern, value):
-            return False
-    return True
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(View):
@@ -33,7 +39,7 @@ class RegisterView(View):
     def post(self, request):
         """Processes registration form data."""
         try:
-            data = json.loads(request.body)
+            data = codec.loads(request.body)
             username = data.get('username')
             password = data.get('password')
             confirm_password = data.get('confirm_password')
@@ -62,7 +68,7 @@ class LoginView(View):
     def post(self, request):
         """Processes login form data."""
         try:
-            data = json.loads(request.body)
+            data = codec.loads(request.body)
             username = data.get('username')
             password = data.get('password')
             if not validate_input({'username': username, 'password': password}):
@@ -83,14 +89,246 @@ class HomeView(View):
             return redirect('portal:login')  
         return render(request, 'portal/home.html')
 
+STUDENT_LIST_FIELDS = ('id', 'name', 'subject', 'marks', 'version')
+# Columns selected for STUDENT_LIST_FIELDS, and filtered or ordered on
+STUDENT_LIST_COLUMNS = ('id', 'name', 'subject__name', 'marks', 'version')
+STUDENT_COLUMN = dict(zip(STUDENT_LIST_FIELDS, STUDENT_LIST_COLUMNS))
+# Fields a list may be ordered and paged by
+STUDENT_ORDERING_FIELDS = ('id', 'name', 'subject', 'marks')
+
+def filter_students(teacher, params):
+    """Returns a teacher's students filtered and ordered by list query parameters.
+
+    Raises ValueError if a filter or the ordering is invalid.
+    """
+    students = Student.objects.filter(teacher=teacher)
+    subject = params.get('subject')
+    if subject:
+        students = students.filter(subject__name=subject)
+    name = params.get('name')
+    if name:
+        # A range on name can use its index; startswith keeps the match exact
+        upper = name[:-1] + chr(ord(name[-1]) + 1)
+        students = students.filter(name__gte=name, name__lt=upper, name__startswith=name)
+    if params.get('min_marks'):
+        students = students.filter(marks__gte=int(params['min_marks']))
+    if params.get('max_marks'):
+        students = students.filter(marks__lte=int(params['max_marks']))
+
+    ordering = params.get('ordering') or 'id'
+    field = ordering.lstrip('-')
+    if field not in STUDENT_ORDERING_FIELDS:
+        raise ValueError(f'Unknown ordering {ordering}')
+    direction = '-' if ordering.startswith('-') else ''
+    order_by = (direction + STUDENT_COLUMN[field], direction + 'id')
+    return students.order_by(*dict.fromkeys(order_by)), ordering
+
+def parse_page_params(params, ordering='id'):
+    """Parses keyset pagination parameters, returning (cursor, limit) or None if invalid.
+
+    The cursor is None for the first page, otherwise a (value, id) pair of the
+    last row seen in the given ordering.
+    """
+    field = ordering.lstrip('-')
+    try:
+        limit = int(params.get('limit', settings.STUDENT_LIST_PAGE_SIZE))
+        after = params.get('after')
+        if after is None or after == '':
+            cursor = None
+        elif field == 'id':
+            cursor = (int(after), int(after))
+            if cursor[1] < 0:
+                return None
+        else:
+            value, separator, pk = after.rpartition(':')
+            if not separator:
+                return None
+            cursor = (int(value) if field == 'marks' else value, int(pk))
+    except (ValueError, TypeError):
+        return None
+    if limit < 1:
+        return None
+    return cursor, min(limit, settings.STUDENT_LIST_MAX_PAGE_SIZE)
+
+def make_page_cursor(row, ordering):
+    """Returns the `after` cursor that continues a listing after the given row."""
+    field = ordering.lstrip('-')
+    if field == 'id':
+        return row['id']
+    return f"{row[field]}:{row['id']}"
+
+def seek_students(students, ordering, cursor):
+    """Restricts an ordered student queryset to rows after the cursor."""
+    column = STUDENT_COLUMN[ordering.lstrip('-')]
+    value, pk = cursor
+    op = 'lt' if ordering.startswith('-') else 'gt'
+    if column == 'id':
+        return students.filter(**{f'id__{op}': pk})
+    # Equivalent to (column, id) > (value, pk) but keeps a sargable bound on column
+    return students.filter(**{f'{column}__{op}e': value}).filter(
+        Q(**{f'{column}__{op}': value}) | Q(**{f'id__{op}': pk})
+    )
+
+def student_rows(students):
+    """Selects STUDENT_LIST_FIELDS as tuples, the subject by name."""
+    return students.values_list(*STUDENT_LIST_COLUMNS)
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+def wants_stream(request):
+    """Returns True if the client asked for the full student list as a stream."""
+    return request.GET.get('stream') == '1' or NDJSON_CONTENT_TYPE in request.headers.get('Accept', '')
+
+def student_list_version(request):
+    """Returns the (version, updated_at) of the user's students, read once per request."""
+    if not hasattr(request, '_student_version'):
+        request._student_version = TableVersion.objects.cached_version(
+            TableVersion.student_table(request.user.pk)
+        )
+    return request._student_version
+
+def student_list_etag(request):
+    """Returns the ETag of the student list, or None when it does not apply."""
+    if not request.user.is_authenticated or wants_stream(request):
+        return None
+    version, _ = student_list_version(request)
+    return f'students-{request.user.pk}-{version}'
+
+def student_list_last_modified(request):
+    """Returns when the user's students last changed, or None when unknown."""
+    if not request.user.is_authenticated or wants_stream(request):
+        return None
+    _, updated_at = student_list_version(request)
+    return updated_at
+
+def student_list_page(teacher, params):
+    """Returns the (payload, status) of one page of a teacher's filtered student list."""
+    try:
+        students, ordering = filter_students(teacher, params)
+    except (ValueError, TypeError):
+        return {'error': 'Invalid filter parameters'}, 400
+    page = parse_page_params(params, ordering)
+    if page is None:
+        return {'error': 'Invalid pagination parameters'}, 400
+    cursor, limit = page
+    if cursor is not None:
+        students = seek_students(students, ordering, cursor)
+
+    # Fetch one extra row to know whether another page exists
+    students = [dict(zip(STUDENT_LIST_FIELDS, row)) for row in student_rows(students)[:limit + 1]]
+    next_cursor = None
+    if len(students) > limit:
+        students = students[:limit]
+        next_cursor = make_page_cursor(students[-1], ordering)
+    return {'results': students, 'next': next_cursor}, 200
+
+def make_change_token(moment):
+    """Returns the change feed token of a moment: microseconds since the epoch."""
+    return str(int(moment.timestamp() * 1_000_000))
+
+def student_changes(teacher, params):
+    """Returns the (payload, status) of a teacher's student upserts and deletions since a token.
+
+    Without `since` only a fresh token is returned. 410 means the client must
+    reload the full list: the token predates the tombstone retention or too
+    many rows changed.
+    """
+    now = timezone.now()
+    token = make_change_token(now)
+    since = params.get('since')
+    if not since:
+        return {'upserts': [], 'deletes': [], 'token': token}, 200
+    try:
+        since = datetime.datetime.fromtimestamp(int(since) / 1_000_000, tz=datetime.timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return {'error': 'Invalid since token'}, 400
+    if since < now - datetime.timedelta(seconds=settings.STUDENT_TOMBSTONE_RETENTION):
+        return {'error': 'Token expired, reload the student list'}, 410
+
+    # Changes are sent again for a short overlap, so a write that committed after
+    # the previous poll with an earlier timestamp is not missed; upserts are idempotent
+    since -= datetime.timedelta(seconds=settings.STUDENT_CHANGES_OVERLAP)
+    limit = settings.STUDENT_CHANGES_MAX_ROWS
+    upserts = [
+        dict(zip(STUDENT_LIST_FIELDS, row))
+        for row in student_rows(
+            Student.objects.filter(teacher=teacher, updated_at__gte=since).order_by('updated_at', 'id')
+        )[:limit + 1]
+    ]
+    deletes = list(
+        StudentTombstone.objects.filter(teacher=teacher, deleted_at__gte=since)
+        .order_by('deleted_at').values_list('student_id', flat=True)[:limit + 1]
+    )
+    if len(upserts) > limit or len(deletes) > limit:
+        return {'error': 'Too many changes, reload the student list'}, 410
+    return {'upserts': upserts, 'deletes': deletes, 'token': token}, 200
+
+def stream_student_list(request):
+    """Streams the user's filtered students as a JSON array or NDJSON."""
+    try:
+        students, _ = filter_students(request.user, request.GET)
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'Invalid filter parameters'}, status=400)
+    ndjson = NDJSON_CONTENT_TYPE in request.headers.get('Accept', '')
+    return streaming_response(
+        request,
+        student_rows(students),
+        JSONStreamEncoder(STUDENT_LIST_FIELDS, ndjson),
+        NDJSON_CONTENT_TYPE if ndjson else 'application/json',
+    )
+
+def streaming_response(request, rows, encoder, content_type):
+    """Streams encoded rows, async-iterable under ASGI so Django never buffers them."""
+    if isinstance(request, ASGIRequest):
+        content = astream_rows(rows, encoder)
+    else:
+        content = stream_rows(rows, encoder)
+    return StreamingHttpResponse(content, content_type=content_type)
+
+@method_decorator(cache_control(private=True, no_cache=True), name='get')
+@method_decorator(condition(etag_func=student_list_etag, last_modified_func=student_list_last_modified), name='get')
 class StudentListView(View):
-    """Returns a list of all students."""
+    """Returns a filtered page of students, or streams the matching rows."""
     def get(self, request):
-        """Returns JSON list of students."""
+        """Returns JSON page of students after the given cursor."""
         if not request.user.is_authenticated:
-            return redirect('portal:login')  
-        students = Student.objects.all().values('id', 'name', 'subject', 'marks')
-        return JsonResponse(list(students), safe=False)
+            return redirect('portal:login')
+        if wants_stream(request):
+            return stream_student_list(request)
+        version, _ = student_list_version(request)
+        payload, status, hit = get_student_page(
+            request.user.pk, version, request.GET, lambda params: student_list_page(request.user, params)
+        )
+        response = JsonResponse(payload, status=status)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+@method_decorator(cache_control(private=True, no_store=True), name='get')
+class StudentChangesView(View):
+    """Returns the user's student upserts and deletions since a change token."""
+    def get(self, request):
+        """Returns JSON changes and the token to poll with next."""
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        payload, status = student_changes(request.user, request.GET)
+        return JsonResponse(payload, status=status)
+
+class StudentExportView(View):
+    """Exports students as a streamed CSV file."""
+    def get(self, request):
+        """Streams the user's matching students, ordered by id, as CSV."""
+        if not request.user.is_authenticated:
+            return redirect('portal:login')
+        students = Student.objects.filter(teacher=request.user)
+        subject = request.GET.get('subject')
+        if subject:
+            students = students.filter(subject__name=subject)
+        students = student_rows(students.order_by('id'))
+        response = streaming_response(
+            request, students, CSVStreamEncoder(STUDENT_LIST_FIELDS), 'text/csv',
+        )
+        response['Content-Disposition'] = 'attachment; filename="students.csv"'
+        return response
 
 @method_decorator(csrf_exempt, name='dispatch')
 class AddStudentView(View):
@@ -101,70 +339,102 @@ class AddStudentView(View):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Unauthorized'}, status=401)
         try:
-            data = json.loads(request.body)
-            name = data.get('name')
-            subject = data.get('subject')
-            marks = data.get('marks')
+            data = codec.loads(request.body)
+            cleaned, error = clean_student_data(data)
+            if error:
+                return JsonResponse({'error': error}, status=400)
+            Student.objects.add_marks(request.user, cleaned['name'], cleaned['subject'], cleaned['marks'])
+            return JsonResponse({'message': 'Student added/updated successfully'}, status=200)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
-            # Check if all required fields are present
-            if not name or not subject or marks is None:
-                return JsonResponse({'error': 'Name, subject, and marks are required'}, status=400)
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchAddStudentView(View):
+    """Adds or accumulates marks for many students in one request."""
+    @method_decorator(require_POST)
+    def post(self, request):
+        """Processes a JSON array of name/subject/marks entries."""
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            data = codec.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        if not isinstance(data, list) or not data:
+            return JsonResponse({'error': 'Expected a non-empty list of students'}, status=400)
+        if len(data) > settings.STUDENT_BATCH_MAX_ROWS:
+            return JsonResponse(
+                {'error': f'At most {settings.STUDENT_BATCH_MAX_ROWS} students per batch'},
+                status=400,
+            )
 
-            if not validate_input({'name': name, 'subject': subject}):
-                return JsonResponse({'error': 'Invalid input'}, status=400)
+        # Validate every row before writing anything
+        results = []
+        entries = []
+        for index, item in enumerate(data):
+            cleaned, error = clean_student_data(item)
+            if error:
+                results.append({'index': index, 'status': 'error', 'error': error})
+            else:
+                results.append({'index': index})
+                entries.append(cleaned)
 
-            try:
-                marks = int(marks)
-                if marks < 0 or marks > 100:
-                    return JsonResponse({'error': 'Marks must be between 0 and 100'}, status=400)
-            except (ValueError, TypeError):
-                return JsonResponse({'error': 'Invalid marks value'}, status=400)
+        statuses = iter(Student.objects.bulk_add_marks(request.user, entries) if entries else [])
+        for result in results:
+            if 'status' not in result:
+                result['status'] = next(statuses)
 
-            try:
-                student = Student.objects.get(name=name, subject=subject)
-                student.marks += marks
-                student.save()
-            except Student.DoesNotExist:
-                Student.objects.create(name=name, subject=subject, marks=marks)
-            return JsonResponse({'message': 'Student added/updated successfully'}, status=200)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        counts = {'created': 0, 'updated': 0, 'error': 0}
+        for result in results:
+            counts[result['status']] += 1
+        return JsonResponse({
+            'results': results,
+            'created': counts['created'],
+            'updated': counts['updated'],
+            'errors': counts['error'],
+        }, status=200)
+
+def save_student_update(teacher, pk, cleaned, version):
+    """Runs a student update, returning the response: 404, 409 with the current version, or the new version."""
+    try:
+        new_version = Student.objects.update_student(teacher, pk, version=version, **cleaned)
+    except StudentVersionConflict as conflict:
+        return JsonResponse(
+            {'error': 'Student was changed by another request', 'version': conflict.current}, status=409,
+        )
+    if new_version is None:
+        return JsonResponse({'error': 'Student not found'}, status=404)
+    response = JsonResponse({'message': 'Student updated successfully', 'version': new_version}, status=200)
+    response['ETag'] = quote_etag(str(new_version))
+    return response
 
 @method_decorator(csrf_exempt, name='dispatch')
 class UpdateStudentView(View):
-    """Updates an existing student."""
+    """Updates an existing student: POST overwrites it, PATCH writes only the fields sent."""
     @method_decorator(require_POST)
     def post(self, request, id):
         """Processes update student request."""
+        return self.update(request, id, clean_student_data)
+
+    def patch(self, request, id):
+        """Processes partial update student request."""
+        return self.update(request, id, clean_student_patch)
+
+    def update(self, request, id, clean):
+        """Validates the body with clean and updates the student, checking If-Match or "version" if sent."""
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Unauthorized'}, status=401)
         try:
-            data = json.loads(request.body)
-            name = data.get('name')
-            subject = data.get('subject')
-            marks = data.get('marks')
-
-            if not validate_input({'name': name, 'subject': subject}):
-                return JsonResponse({'error': 'Invalid input'}, status=400)
-
-            try:
-                marks = int(marks)
-                if marks < 0 or marks > 100:
-                    return JsonResponse({'error': 'Marks must be between 0 and 100'}, status=400)
-            except (ValueError, TypeError):
-                return JsonResponse({'error': 'Invalid marks value'}, status=400)
-
-            try:
-                student = Student.objects.get(id=id)
-                student.name = name
-                student.subject = subject
-                student.marks = marks
-                student.save()
-                return JsonResponse({'message': 'Student updated successfully'}, status=200)
-            except Student.DoesNotExist:
-                return JsonResponse({'error': 'Student not found'}, status=404)
+            data = codec.loads(request.body)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        cleaned, error = clean(data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        version, error = clean_version(request, data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        return save_student_update(request.user, id, cleaned, version)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class DeleteStudentView(View):
@@ -174,12 +444,134 @@ class DeleteStudentView(View):
         """Processes delete student request."""
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Unauthorized'}, status=401)
-        try:
-            student = Student.objects.get(id=id)
-            student.delete()
-            return JsonResponse({'message': 'Student deleted successfully'}, status=200)
-        except Student.DoesNotExist:
+        if not Student.objects.delete_student(request.user, id):
             return JsonResponse({'error': 'Student not found'}, status=404)
+        return JsonResponse({'message': 'Student deleted successfully'}, status=200)
+
+STUDENT_FILTER_PARAMS = ('subject', 'name', 'min_marks', 'max_marks')
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkDeleteStudentsView(View):
+    """Deletes many of the user's students, by id or by list filters, in one statement."""
+    @method_decorator(require_POST)
+    def post(self, request):
+        """Processes {"ids": [...]} or {"filter": {...}} and returns the deleted ids."""
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            data = codec.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        if not isinstance(data, dict) or len(data.keys() & {'ids', 'filter'}) != 1:
+            return JsonResponse({'error': 'Expected either ids or filter'}, status=400)
+
+        if 'ids' in data:
+            ids = data['ids']
+            if (not isinstance(ids, list) or not ids
+                    or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)):
+                return JsonResponse({'error': 'Expected a non-empty list of student ids'}, status=400)
+            if len(ids) > settings.STUDENT_BATCH_MAX_ROWS:
+                return JsonResponse(
+                    {'error': f'At most {settings.STUDENT_BATCH_MAX_ROWS} students per batch'},
+                    status=400,
+                )
+            students = Student.objects.filter(pk__in=ids)
+        else:
+            params = data['filter']
+            # An empty filter would delete every student; require at least one condition
+            if (not isinstance(params, dict) or not params or not params.keys() <= set(STUDENT_FILTER_PARAMS)
+                    or not all(isinstance(value, (str, int)) and value != '' for value in params.values())):
+                return JsonResponse({'error': 'Invalid filter parameters'}, status=400)
+            try:
+                students, _ = filter_students(request.user, {key: str(value) for key, value in params.items()})
+            except (ValueError, TypeError):
+                return JsonResponse({'error': 'Invalid filter parameters'}, status=400)
+
+        deleted = Student.objects.delete_students(request.user, students)
+        return JsonResponse({'deleted': len(deleted), 'ids': deleted}, status=200)
+
+class SubjectSummaryView(View):
+    """Returns per-subject statistics of the user's student marks."""
+    def get(self, request):
+        """Returns JSON list of subject summaries."""
+        if not request.user.is_authenticated:
+            return redirect('portal:login')
+        rows = SubjectSummary.objects.filter(teacher=request.user).select_related('subject')
+        summaries = [
+            {
+                'subject': summary.subject.name,
+                'count': summary.count,
+                'sum': summary.total,
+                'min': summary.min_marks,
+                'max': summary.max_marks,
+                'average': summary.average,
+                'stddev': summary.stddev,
+            }
+            for summary in rows.order_by('subject__name')
+        ]
+        return JsonResponse({'results': summaries})
+
+class SubjectListView(View):
+    """Returns the names of all subjects, for suggestions when entering marks."""
+    def get(self, request):
+        """Returns JSON list of subject names from the cache."""
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        return JsonResponse({'results': get_subject_names()})
+
+# A UTC offset whose "+" arrived as a space, because the client did not percent-encode it
+UNENCODED_OFFSET = re.compile(r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?) (\d{2}(?::?\d{2})?)$')
+
+def parse_timestamp(value):
+    """Parses an ISO 8601 timestamp or Unix epoch seconds into an aware datetime, or returns None."""
+    value = value.strip()
+    try:
+        if re.fullmatch(r'\d+(?:\.\d+)?', value):
+            return datetime.datetime.fromtimestamp(float(value), tz=datetime.timezone.utc)
+        when = parse_datetime(UNENCODED_OFFSET.sub(r'\1+\2', value))
+    except (ValueError, OverflowError, OSError):
+        return None
+    if when is not None and timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+class StudentsAsOfView(View):
+    """Returns the user's student totals as they were at a past moment, from the marks ledger."""
+    def get(self, request):
+        """Returns one page of students with their marks at the `at` timestamp."""
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        when = parse_timestamp(request.GET.get('at', ''))
+        if when is None:
+            return JsonResponse({'error': 'Expected an ISO 8601 timestamp or epoch seconds in at'}, status=400)
+        page = parse_page_params(request.GET)
+        if page is None:
+            return JsonResponse({'error': 'Invalid pagination parameters'}, status=400)
+        cursor, limit = page
+
+        students = Student.objects.totals_as_of(request.user, when)
+        subject = request.GET.get('subject')
+        if subject:
+            students = students.filter(subject__name=subject)
+        if cursor is not None:
+            students = students.filter(id__gt=cursor[1])
+        rows = students.order_by('id').values_list('id', 'name', 'subject__name', 'marks_as_of')[:limit + 1]
+        results = [dict(zip(('id', 'name', 'subject', 'marks'), row)) for row in rows]
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = results[-1]['id']
+        return JsonResponse({'as_of': when.isoformat(), 'results': results, 'next': next_cursor})
+
+class StudentListCacheStatsView(View):
+    """Reports the hit/miss counters of the student list cache in this process."""
+    def get(self, request):
+        """Returns the cache counters as JSON."""
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        stats = student_list_stats.snapshot()
+        stats['backend'] = settings.CACHES[settings.STUDENT_LIST_CACHE]['BACKEND']
+        return JsonResponse(stats)
 
 class LogoutView(View):
     """Handles user logout."""
@@ -188,6 +580,14 @@ class LogoutView(View):
         logout(request)
         return redirect('portal:login')  
 
+def metrics_view(request):
+    """Exposes Prometheus metrics behind the METRICS_TOKEN bearer token, required unless DEBUG is on."""
+    if not settings.METRICS or not (settings.METRICS_TOKEN or settings.DEBUG):
+        return HttpResponse(status=404)
+    if settings.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(scrape_registry()), content_type=CONTENT_TYPE_LATEST)
+
 def health_check(request):
     """Simple health check endpoint."""
     return HttpResponse("OK", content_type="text/plain")
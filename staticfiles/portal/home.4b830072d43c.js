@@ -0,0 +1,278 @@
+// Initialize editing ID and the student as it was when the edit started
+let editingId = null;
+let editingStudent = null;
+
+// Students shown in the table by id, and the change token they are current as of
+const students = new Map();
+let changeToken = null;
+// Seconds between polls of the change feed, used while no event stream is connected
+const POLL_INTERVAL = 5;
+let pollTimer = null;
+let syncQueued = false;
+
+// Display toast notification for 3 seconds
+function showToast(message) {
+    const toast = document.getElementById('toast');
+    const toastMessage = document.getElementById('toastMessage');
+    toastMessage.textContent = message;
+    toast.classList.remove('hidden', 'opacity-0');
+    toast.classList.add('opacity-100');
+    setTimeout(() => {
+        toast.classList.remove('opacity-100');
+        toast.classList.add('opacity-0');
+        setTimeout(() => toast.classList.add('hidden'), 300);
+    }, 3000);
+}
+
+// Build a table row for a student
+function renderStudentRow(student) {
+    const tr = document.createElement('tr');
+    tr.innerHTML = `
+        <td class="p-2">${student.name}</td>
+        <td class="p-2">${student.subject}</td>
+        <td class="p-2">${student.marks}</td>
+        <td class="p-2">
+            <button onclick="editStudent(${student.id})" class="bg-yellow-500 text-white px-2 py-1 rounded hover:bg-yellow-600">Edit</button>
+            <button onclick="deleteStudent(${student.id})" class="bg-red-500 text-white px-2 py-1 rounded hover:bg-red-600">Delete</button>
+        </td>
+    `;
+    return tr;
+}
+
+// Current filter values, as sent to the server
+function currentFilters() {
+    return {
+        subject: document.getElementById('filterSubject').value.trim(),
+        name: document.getElementById('filterName').value.trim(),
+        ordering: document.getElementById('filterOrdering').value,
+    };
+}
+
+// Apply the filters locally to a changed student
+function matchesFilters(student, filters) {
+    return (!filters.subject || student.subject === filters.subject)
+        && (!filters.name || student.name.startsWith(filters.name));
+}
+
+// Order students like the server: by the chosen field, then by id
+function compareStudents(ordering) {
+    const field = ordering.replace('-', '');
+    const direction = ordering.startsWith('-') ? -1 : 1;
+    return (a, b) => {
+        if (a[field] !== b[field]) return (a[field] < b[field] ? -1 : 1) * direction;
+        return (a.id - b.id) * direction;
+    };
+}
+
+// Redraw the table from the local students
+function renderStudents() {
+    const ordering = currentFilters().ordering;
+    const fragment = document.createDocumentFragment();
+    [...students.values()].sort(compareStudents(ordering))
+        .forEach(student => fragment.appendChild(renderStudentRow(student)));
+    document.getElementById('studentTable').replaceChildren(fragment);
+}
+
+// Load students page by page from server and populate table
+async function loadStudents() {
+    try {
+        // Take the token first, so changes made while paging are picked up by the next sync
+        const tokenResponse = await fetch('/students/changes/');
+        if (!tokenResponse.ok) throw new Error('Failed to fetch students');
+        const token = (await tokenResponse.json()).token;
+        const params = new URLSearchParams(currentFilters());
+        const loaded = new Map();
+        let after = '';
+        while (after !== null) {
+            params.set('after', after);
+            const response = await fetch(`/students/?${params}`, { cache: 'no-cache' });
+            if (!response.ok) throw new Error('Failed to fetch students');
+            const page = await response.json();
+            page.results.forEach(student => loaded.set(student.id, student));
+            after = page.next;
+        }
+        students.clear();
+        loaded.forEach((student, id) => students.set(id, student));
+        changeToken = token;
+        renderStudents();
+    } catch (error) {
+        alert('Error loading students: ' + error.message);
+    }
+}
+
+// Fetch what changed since the last sync and apply it to the table
+async function syncStudents() {
+    if (changeToken === null) return;
+    try {
+        const response = await fetch(`/students/changes/?since=${changeToken}`);
+        if (response.status === 410) {
+            await loadStudents();
+            return;
+        }
+        if (!response.ok) return;
+        const changes = await response.json();
+        const filters = currentFilters();
+        changes.upserts.forEach(student => {
+            if (matchesFilters(student, filters)) {
+                students.set(student.id, student);
+            } else {
+                students.delete(student.id);
+            }
+        });
+        changes.deletes.forEach(id => students.delete(id));
+        changeToken = changes.token;
+        if (changes.upserts.length || changes.deletes.length) renderStudents();
+    } catch (error) {
+        // Try again at the next poll
+    }
+}
+
+// Poll the change feed while the page is visible
+function startPolling() {
+    if (pollTimer !== null) return;
+    pollTimer = setInterval(() => {
+        if (!document.hidden) syncStudents();
+    }, POLL_INTERVAL * 1000);
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Coalesce bursts of events into one sync
+function queueSync() {
+    if (syncQueued) return;
+    syncQueued = true;
+    setTimeout(() => {
+        syncQueued = false;
+        syncStudents();
+    }, 100);
+}
+
+// Open modal for adding/editing student
+function openModal(title, buttonText, name = '', subject = '', marks = '') {
+    document.getElementById('modalTitle').textContent = title;
+    document.getElementById('submitBtn').textContent = buttonText;
+    document.getElementById('studentName').value = name;
+    document.getElementById('studentSubject').value = subject;
+    document.getElementById('studentMarks').value = marks;
+    document.getElementById('modalError').classList.add('hidden');
+    document.getElementById('studentModal').classList.remove('hidden');
+}
+
+// Initialize edit mode with student data
+async function editStudent(id) {
+    editingId = id;
+    editingStudent = students.get(id);
+    openModal('Edit Student', 'Update', editingStudent.name, editingStudent.subject, editingStudent.marks);
+}
+
+// Delete student with confirmation
+async function deleteStudent(id) {
+    if (confirm('Are you sure you want to delete this student?')) {
+        try {
+            const response = await fetch(`/student/${id}/delete/`, { method: 'POST' });
+            const data = await response.json();
+            if (response.ok) {
+                showToast('Student deleted successfully');
+                syncStudents();
+            } else {
+                alert(data.error);
+            }
+        } catch (error) {
+            alert('Error deleting student: ' + error.message);
+        }
+    }
+}
+
+// Reload the table when filters are applied
+document.getElementById('filterForm').addEventListener('submit', (e) => {
+    e.preventDefault();
+    loadStudents();
+});
+
+// Handle add student button click
+document.getElementById('addStudentBtn').addEventListener('click', () => {
+    editingId = null;
+    openModal('Add New Student', 'Add');
+});
+
+// Handle modal cancel button
+document.getElementById('cancelBtn').addEventListener('click', () => {
+    document.getElementById('studentModal').classList.add('hidden');
+});
+
+// Handle student form submission
+document.getElementById('studentForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const name = document.getElementById('studentName').value.trim();
+    const subject = document.getElementById('studentSubject').value.trim();
+    const marksInput = document.getElementById('studentMarks').value;
+    const modalError = document.getElementById('modalError');
+
+    // Validate marks client-side
+    const marks = parseInt(marksInput, 10);
+    if (isNaN(marks) || marks < 0 || marks > 100) {
+        modalError.textContent = 'Marks must be a number between 0 and 100';
+        modalError.classList.remove('hidden');
+        return;
+    }
+
+    let request = {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ name, subject, marks })
+    };
+    if (editingId) {
+        // Send only the changed fields, and only if nobody changed the student meanwhile
+        const changes = Object.fromEntries(
+            Object.entries({ name, subject, marks }).filter(([field, value]) => value !== editingStudent[field])
+        );
+        if (Object.keys(changes).length === 0) {
+            document.getElementById('studentModal').classList.add('hidden');
+            return;
+        }
+        request = {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json', 'If-Match': `"${editingStudent.version}"` },
+            body: JSON.stringify(changes)
+        };
+    }
+    const url = editingId ? `/student/${editingId}/` : '/student/';
+    try {
+        const response = await fetch(url, request);
+        const data = await response.json();
+        if (response.status === 409) {
+            modalError.textContent = 'This student was changed by someone else; reopen it to see the latest values';
+            modalError.classList.remove('hidden');
+            syncStudents();
+        } else if (response.ok) {
+            document.getElementById('studentModal').classList.add('hidden');
+            showToast(editingId ? 'Student updated successfully' : 'Student added successfully');
+            syncStudents();
+        } else {
+            modalError.textContent = data.error;
+            modalError.classList.remove('hidden');
+        }
+    } catch (error) {
+        modalError.textContent = 'An error occurred';
+        modalError.classList.remove('hidden');
+    }
+});
+
+// Initial load of students, then follow changes pushed by the server,
+// falling back to polling while the event stream is down
+loadStudents();
+startPolling();
+// The stream URL is only set where the server runs the async views
+const eventsUrl = document.currentScript.dataset.eventsUrl;
+if (eventsUrl && window.EventSource) {
+    const events = new EventSource(eventsUrl);
+    events.addEventListener('open', () => {
+        stopPolling();
+        queueSync();
+    });
+    events.addEventListener('error', startPolling);
+    ['add', 'update', 'delete', 'batch', 'reset'].forEach(type => events.addEventListener(type, queueSync));
+}